@@ -30,6 +30,13 @@ from datetime import datetime
 from http.server import HTTPServer, BaseHTTPRequestHandler
 import queue
 
+# Optional: numba fuses spiral build + rotate + limit filter into one kernel
+try:
+    import numpy as np
+    from numba import njit
+except ImportError:
+    njit = None
+
 # Parse command line arguments
 parser = argparse.ArgumentParser(description='JTAG Glitch Heat Map Scanner')
 parser.add_argument('--reverse', '-r', action='store_true',
@@ -846,6 +853,92 @@ def generate_spiral_points(size):
 
     return points
 
+def build_scan_order_py(size, start_x, start_y, half, reverse):
+    """Spiral order, optionally reversed, rotated so (start_x, start_y) is
+    first (start_x < 0 = no custom start) and limited to points within
+    Chebyshev distance half of the first point (half < 0 = no limit)"""
+    points = generate_spiral_points(size)
+    if reverse:
+        points.reverse()
+    if start_x >= 0:
+        idx = points.index((start_x, start_y))
+        points = points[idx:] + points[:idx]
+    if half >= 0:
+        sx, sy = points[0]
+        points = [(x, y) for (x, y) in points
+                  if abs(x - sx) <= half and abs(y - sy) <= half]
+    return points
+
+if njit is not None:
+    @njit(cache=True)
+    def _build_scan_order_kernel(size, start_x, start_y, half, reverse):
+        """Fused build + reverse + rotate + limit over the spiral rings"""
+        n = (size + 1) * (size + 1)
+        ring = np.empty((n, 2), np.int32)
+        k = 0
+        offset = 0
+        while offset <= size // 2:
+            lo = offset
+            hi = size - offset
+            if lo == hi:
+                ring[k, 0] = lo
+                ring[k, 1] = lo
+                k += 1
+                break
+            ring[k, 0] = lo
+            ring[k, 1] = lo
+            k += 1
+            for x in range(lo + 1, hi + 1):
+                ring[k, 0] = x
+                ring[k, 1] = lo
+                k += 1
+            for y in range(lo + 1, hi + 1):
+                ring[k, 0] = hi
+                ring[k, 1] = y
+                k += 1
+            for x in range(hi - 1, lo - 1, -1):
+                ring[k, 0] = x
+                ring[k, 1] = hi
+                k += 1
+            for y in range(hi - 1, lo, -1):
+                ring[k, 0] = lo
+                ring[k, 1] = y
+                k += 1
+            offset += 1
+
+        # Index of the first point in (possibly reversed) scan order
+        first = 0
+        if start_x >= 0:
+            for j in range(n):
+                p = n - 1 - j if reverse else j
+                if ring[p, 0] == start_x and ring[p, 1] == start_y:
+                    first = j
+                    break
+        p = n - 1 - first if reverse else first
+        sx = ring[p, 0]
+        sy = ring[p, 1]
+
+        cap = n if half < 0 else min(n, (2 * half + 1) ** 2)
+        out = np.empty((cap, 2), np.int32)
+        m = 0
+        for j in range(n):
+            jj = (first + j) % n
+            p = n - 1 - jj if reverse else jj
+            x = ring[p, 0]
+            y = ring[p, 1]
+            if half < 0 or (abs(x - sx) <= half and abs(y - sy) <= half):
+                out[m, 0] = x
+                out[m, 1] = y
+                m += 1
+        return out[:m]
+
+    def build_scan_order(size, start_x, start_y, half, reverse):
+        """numba-accelerated build_scan_order_py"""
+        out = _build_scan_order_kernel(size, start_x, start_y, half, reverse)
+        return [(int(x), int(y)) for x, y in out]
+else:
+    build_scan_order = build_scan_order_py
+
 # Handle single position mode
 if SINGLE_POSITION:
     if START_X is not None and START_Y is not None:
@@ -855,39 +948,27 @@ if SINGLE_POSITION:
         print("ERROR: --single requires --start-x and --start-y", flush=True)
         exit(1)
 else:
-    spiral_points = generate_spiral_points(SIZE)
-
+    # Last point of the forward spiral
+    center = (SIZE // 2, SIZE // 2 + SIZE % 2)
     if REVERSE_SPIRAL:
-        spiral_points.reverse()
-        direction_str = f"REVERSE: center ({spiral_points[0]}) -> (0,0)"
+        direction_str = f"REVERSE: center ({center}) -> (0,0)"
     else:
-        direction_str = f"FORWARD: (0,0) -> center ({spiral_points[-1]})"
+        direction_str = f"FORWARD: (0,0) -> center ({center})"
 
-    # Override start point if specified
+    # Override start point if specified (the spiral covers the whole grid)
+    start_x = start_y = -1
     if START_X is not None and START_Y is not None:
-        # Find the specified point in the spiral and reorder so it's first
-        target = (START_X, START_Y)
-        if target in spiral_points:
-            idx = spiral_points.index(target)
-            spiral_points = spiral_points[idx:] + spiral_points[:idx]
+        if 0 <= START_X <= SIZE and 0 <= START_Y <= SIZE:
+            start_x, start_y = START_X, START_Y
             direction_str = f"CUSTOM START: ({START_X}, {START_Y})"
         else:
             print(f"WARNING: Start position ({START_X}, {START_Y}) not in grid, using default", flush=True)
 
-    # Apply position limit if specified
-    if POSITION_LIMIT > 0 and len(spiral_points) > 0:
-        start_point = spiral_points[0]
-        half_limit = POSITION_LIMIT // 2
-        # Filter to NxN grid around start point
-        filtered_points = []
-        for (x, y) in spiral_points:
-            dx = abs(x - start_point[0])
-            dy = abs(y - start_point[1])
-            if dx <= half_limit and dy <= half_limit:
-                filtered_points.append((x, y))
-        original_count = len(spiral_points)
-        spiral_points = filtered_points
-        print(f"Position limit: {POSITION_LIMIT}x{POSITION_LIMIT} around {start_point} ({len(spiral_points)} of {original_count} points)", flush=True)
+    # Position limit restricts to an NxN grid around the start point
+    half_limit = POSITION_LIMIT // 2 if POSITION_LIMIT > 0 else -1
+    spiral_points = build_scan_order(SIZE, start_x, start_y, half_limit, REVERSE_SPIRAL)
+    if POSITION_LIMIT > 0:
+        print(f"Position limit: {POSITION_LIMIT}x{POSITION_LIMIT} around {spiral_points[0]} ({len(spiral_points)} of {(SIZE + 1) ** 2} points)", flush=True)
 
 print(f"Spiral: {len(spiral_points)} points, {direction_str}", flush=True)
 
@@ -5,6 +5,11 @@ Extract and analyze boot sequence from LPC2468 boot ROM disassembly
 
 import re
 import sys
+from collections import namedtuple
+
+
+# One parsed instruction; asm_lc is the lower-cased asm, cached for searching
+Instr = namedtuple('Instr', 'addr hex asm asm_lc')
 
 
 def parse_disassembly(filename):
@@ -21,11 +26,7 @@ def parse_disassembly(filename):
                 hex_code = match.group(2)
                 asm = match.group(3).strip()
 
-                instructions.append({
-                    'addr': addr,
-                    'hex': hex_code,
-                    'asm': asm
-                })
+                instructions.append(Instr(addr, hex_code, asm, asm.lower()))
 
     return instructions
 
@@ -35,7 +36,7 @@ def find_boot_sequence(instructions, start_addr, end_addr):
 
     sequence = []
     for instr in instructions:
-        if start_addr <= instr['addr'] <= end_addr:
+        if start_addr <= instr.addr <= end_addr:
             sequence.append(instr)
 
     return sequence
@@ -47,27 +48,21 @@ def print_sequence(sequence, title):
     print(f"\n{title}")
     print("=" * 70)
     for instr in sequence:
-        print(f"0x{instr['addr']:08x}:  {instr['hex']:8s}  {instr['asm']}")
+        print(f"0x{instr.addr:08x}:  {instr.hex:8s}  {instr.asm}")
     print()
 
 
 def find_crp_check(instructions):
     """Find CRP check code that reads from 0x1FC"""
 
-    # Look for load from address 0x1FC
-    crp_sequence = []
-    found_crp = False
-
+    # Look for load from address 0x1FC; only the first reference is reported
     for i, instr in enumerate(instructions):
-        if '0x1fc' in instr['asm'].lower() or '0x000001fc' in instr['asm'].lower():
-            # Found reference to CRP location, get surrounding context
-            start = max(0, i - 5)
-            end = min(len(instructions), i + 20)
-            crp_sequence = instructions[start:end]
-            found_crp = True
-            break
+        asm = instr.asm_lc
+        if '0x1fc' in asm or '0x000001fc' in asm:
+            # Found reference to CRP location, return surrounding context
+            return instructions[max(0, i - 5):min(len(instructions), i + 20)]
 
-    return crp_sequence if found_crp else []
+    return []
 
 
 def find_checksum_code(instructions):
@@ -79,7 +74,7 @@ def find_checksum_code(instructions):
     checksum_candidates = []
 
     for i, instr in enumerate(instructions):
-        asm = instr['asm'].lower()
+        asm = instr.asm_lc
 
         # Look for loads from address 0
         if 'ldr' in asm and ('#0' in asm or ', #0' in asm or '[r' in asm):
@@ -89,12 +84,12 @@ def find_checksum_code(instructions):
             context = instructions[start:end]
 
             # Check if there's a loop (branch back)
-            has_loop = any('b.' in inst['asm'].lower() for inst in context)
-            has_add = any('add' in inst['asm'].lower() for inst in context)
+            has_loop = any('b.' in inst.asm_lc for inst in context)
+            has_add = any('add' in inst.asm_lc for inst in context)
 
             if has_loop and has_add:
                 checksum_candidates.append({
-                    'addr': instr['addr'],
+                    'addr': instr.addr,
                     'context': context
                 })
 
@@ -141,7 +136,7 @@ def main():
         for i, candidate in enumerate(checksum_candidates[:3]):  # Show first 3
             print(f"\nCandidate {i+1} at 0x{candidate['addr']:08x}:")
             for instr in candidate['context'][:15]:  # Show first 15 instructions
-                print(f"  0x{instr['addr']:08x}:  {instr['asm']}")
+                print(f"  0x{instr.addr:08x}:  {instr.asm}")
 
     print("\n" + "=" * 70)
     print("Analysis complete!")
@@ -10,10 +10,17 @@ Strategy:
 5. Repeat to map out full parameter space
 """
 
+import math
 import serial
 import time
-import csv
+import sqlite3
+import argparse
+import queue
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from statistics import NormalDist
 import os
 
 SERIAL_PORT = '/dev/ttyACM1'
@@ -23,43 +30,78 @@ TIMEOUT = 2.0
 # Test iterations per parameter combo
 ITERATIONS_PER_TEST = 10  # Test each combo 10 times to get crash rate
 
+# Finest pause step explored in Phase 3 (cycles); every pass stride is a multiple
+PAUSE_RESOLUTION = 5
+
+# Suppress per-attempt result lines (set by --quiet)
+QUIET = False
+
+# Every attempt so far, keyed by (voltage, pause, width):
+# {'results': [...], 'elapsed': [...]}
+_stats_cache = {}
+
+# Result database is committed every N rows or N seconds, whichever comes first
+DB_COMMIT_ROWS = 50
+DB_COMMIT_SECS = 10.0
+
+# One row per glitch attempt; same columns as the sweep CSVs, so
+# analyze_glitch_results.py can read either
+RUNS_SCHEMA = """
+PRAGMA journal_mode=WAL;
+PRAGMA synchronous=NORMAL;
+CREATE TABLE IF NOT EXISTS runs (
+    timestamp TEXT,
+    voltage INTEGER,
+    pause INTEGER,
+    width INTEGER,
+    result TEXT,
+    elapsed_time REAL
+);
+"""
+
 
 def send_command(ser, cmd, wait_time=0.2):
-    if ser.in_waiting > 0:
-        ser.read(ser.in_waiting)
+    """Send command; return at the CS '#' prompt (3s max) or Pico '> ' prompt (wait_time max)."""
+    ser.reset_input_buffer()
     ser.write(f"{cmd}\r\n".encode())
 
     if cmd.startswith("CS "):
-        response = ""
-        max_wait = 3.0
-        start_time = time.time()
-        while time.time() - start_time < max_wait:
-            time.sleep(0.1)
-            if ser.in_waiting > 0:
-                chunk = ser.read(ser.in_waiting).decode('utf-8', errors='ignore')
-                response += chunk
-                if "#" in chunk:
-                    break
-        return response
+        saved_timeout = ser.timeout
+        ser.timeout = 3.0
+        try:
+            return ser.read_until(b'#').decode('utf-8', errors='ignore')
+        finally:
+            ser.timeout = saved_timeout
     else:
-        time.sleep(wait_time)
-        response = ""
-        if ser.in_waiting > 0:
-            response = ser.read(ser.in_waiting).decode('utf-8', errors='ignore')
+        found, response = wait_for_response(ser, "> ", timeout=wait_time)
+        # The LF of our CRLF draws a second '\r\n> '; consume it too so a
+        # later wait for '> ' can't return on it
+        if found and response.count("> ") < 2:
+            wait_for_response(ser, "> ", timeout=0.05)
         return response
 
 
 def wait_for_response(ser, expected_text, timeout=5.0):
-    start_time = time.time()
-    full_response = ""
-    while time.time() - start_time < timeout:
-        if ser.in_waiting > 0:
-            chunk = ser.read(ser.in_waiting).decode('utf-8', errors='ignore')
-            full_response += chunk
-            if expected_text in full_response:
-                return True, full_response
-        time.sleep(0.01)
-    return False, full_response
+    """Block in read() (no sleep polling) until expected_text arrives or timeout."""
+    deadline = time.monotonic() + timeout
+    expected = expected_text.encode()
+    buf = bytearray()
+    saved_timeout = ser.timeout
+    try:
+        remaining = timeout
+        while remaining > 0:
+            ser.timeout = remaining
+            first = ser.read(1)
+            if not first:
+                break
+            buf += first
+            buf += ser.read(ser.in_waiting)
+            if expected in buf:
+                return True, buf.decode('utf-8', errors='ignore')
+            remaining = deadline - time.monotonic()
+    finally:
+        ser.timeout = saved_timeout
+    return False, buf.decode('utf-8', errors='ignore')
 
 
 def setup_system(ser):
@@ -84,15 +126,14 @@ def test_single_glitch(ser, voltage, pause, width):
     success, _ = wait_for_response(ser, "LPC ISP sync complete", timeout=5.0)
     if not success:
         return "SYNC_FAIL"
+    # Drain SYNC's own prompt pair so ARM ON doesn't match on it
+    wait_for_response(ser, "> \r\n> ", timeout=0.2)
 
     # Arm and test
     send_command(ser, "ARM ON", wait_time=0.2)
+    ser.reset_input_buffer()
     ser.write(b'TARGET SEND "R 0 516096"\r\n')
-    time.sleep(1.0)
-
-    response = ""
-    if ser.in_waiting > 0:
-        response = ser.read(ser.in_waiting).decode('utf-8', errors='ignore')
+    _, response = wait_for_response(ser, "> ", timeout=3.0)
 
     if "19" in response:
         return "ERROR19"
@@ -104,20 +145,55 @@ def test_single_glitch(ser, voltage, pause, width):
         return "UNKNOWN"
 
 
-def test_parameters_multiple(ser, voltage, pause, width, iterations=10):
-    """Test parameters multiple times and return statistics."""
-    results = []
-    for i in range(iterations):
+def crash_rate_interval(crashes, n, confidence=0.95):
+    """Wilson score interval (in %) for the true crash rate after n attempts."""
+    z = NormalDist().inv_cdf(1 - (1 - confidence) / 2)
+    p = crashes / n
+    centre = (p + z * z / (2 * n)) / (1 + z * z / n)
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+    return (centre - half) * 100, (centre + half) * 100
+
+
+def test_parameters_multiple(ser, voltage, pause, width, iterations=10,
+                             threshold=None, confidence=0.95):
+    """Test parameters multiple times and return statistics.
+
+    Attempts are cached per (voltage, pause, width) across phases, so only
+    enough new attempts to reach iterations are run; statistics cover every
+    cached attempt and 'fresh' counts the ones run by this call. With a
+    crash-rate threshold (%), testing stops early once the threshold lies
+    outside the confidence interval, i.e. the caller's question is answered.
+    """
+    samples = _stats_cache.setdefault((voltage, pause, width), {'results': [], 'elapsed': []})
+    results = samples['results']
+    elapsed = samples['elapsed']
+    fresh = 0
+    lines = []
+    while len(results) < iterations:
+        if threshold is not None and results:
+            low, high = crash_rate_interval(results.count("NO_RESPONSE"), len(results), confidence)
+            if not low <= threshold <= high:
+                lines.append(f"  Decided after {len(results)}: crash rate {low:.0f}-{high:.0f}% vs {threshold}%")
+                break
+
+        test_start = time.time()
         result = test_single_glitch(ser, voltage, pause, width)
+        elapsed.append(time.time() - test_start)
         results.append(result)
-        print(f"  [{i+1}/{iterations}] V={voltage}, P={pause}, W={width}: {result}")
+        fresh += 1
+        lines.append(f"  [{len(results)}/{iterations}] V={voltage}, P={pause}, W={width}: {result}")
+
+    # One write per call rather than per attempt
+    if lines and not QUIET:
+        print("\n".join(lines), flush=True)
 
-    success_count = results.count("SUCCESS")
-    no_response_count = results.count("NO_RESPONSE")
-    error19_count = results.count("ERROR19")
+    counts = Counter(results)
+    success_count = counts["SUCCESS"]
+    no_response_count = counts["NO_RESPONSE"]
+    error19_count = counts["ERROR19"]
 
-    crash_rate = (no_response_count / iterations) * 100
-    success_rate = (success_count / iterations) * 100
+    crash_rate = (no_response_count / len(results)) * 100
+    success_rate = (success_count / len(results)) * 100
 
     return {
         'success': success_count,
@@ -125,137 +201,204 @@ def test_parameters_multiple(ser, voltage, pause, width, iterations=10):
         'error19': error19_count,
         'crash_rate': crash_rate,
         'success_rate': success_rate,
-        'results': results
+        'results': list(results),
+        'elapsed': list(elapsed),
+        'fresh': fresh
     }
 
 
-def find_crash_pause(ser, width=150):
-    """Find a pause value that causes crashes at V=500."""
+def find_crash_pause(ser, width=150, lo=0, hi=7500, tol=250):
+    """Find the earliest pause value that causes crashes at V=500.
+
+    Crash rate rises with pause once past a threshold, so the boundary is
+    bisected between lo and hi (to within tol cycles) instead of swept.
+    """
     print("=" * 70)
     print("PHASE 1: Finding crash pause value")
     print("=" * 70)
-    print(f"Testing at V=500, Width={width}\n")
+    print(f"Testing at V=500, Width={width}, Pause={lo}-{hi}\n")
 
-    # Test pause values from early to late
-    pause_values = [0, 500, 1000, 1500, 2000, 2500, 3000, 3500, 4000,
-                    4500, 5000, 5500, 6000, 6500, 7000, 7500]
+    # The top of the range must crash, otherwise there is no boundary to find
+    print(f"\nTesting Pause={hi}...")
+    stats = test_parameters_multiple(ser, 500, hi, width, iterations=5, threshold=50)
+    if stats['crash_rate'] <= 50:
+        print("\n✗ No crash pause found in range!")
+        return None
 
-    for pause in pause_values:
-        print(f"\nTesting Pause={pause}...")
-        stats = test_parameters_multiple(ser, 500, pause, width, iterations=5)
+    while hi - lo > tol:
+        mid = (lo + hi) // 2
+        print(f"\nTesting Pause={mid} (bracket {lo}-{hi})...")
+        stats = test_parameters_multiple(ser, 500, mid, width, iterations=5, threshold=50)
 
         if stats['crash_rate'] > 50:
-            print(f"\n✓ Found crash pause: {pause} (crash rate: {stats['crash_rate']:.1f}%)")
-            return pause
+            hi = mid
+        else:
+            lo = mid
+
+    print(f"\n✓ Found crash pause: {hi}")
+    return hi
 
-    print("\n✗ No crash pause found in range!")
-    return None
 
+def find_optimal_voltage(ser, pause, width=150, lo=150, hi=500, tol=5, target=50):
+    """Find voltage with 0% < crash rate < 100%, preferably ~50%.
 
-def find_optimal_voltage(ser, pause, width=150):
-    """Find voltage with 0% < crash rate < 100%, preferably ~50%."""
+    Golden-section search for the voltage whose crash rate is closest to
+    target over [lo, hi], reusing one interior probe per step. Crash rate
+    never falls as voltage rises, so when both probes are equally far from
+    target (e.g. both 0% or both 100%) the side of target they sit on
+    decides which end of the bracket to drop.
+    """
     print("\n" + "=" * 70)
     print("PHASE 2: Finding optimal voltage")
     print("=" * 70)
-    print(f"Testing at Pause={pause}, Width={width}\n")
-
-    # Phase 2a: Start at 500V and work down in 25V steps to find non-crash voltage
-    print("Phase 2a: Finding voltage with 0% crashes...")
-    last_crash_voltage = None
-    no_crash_voltage = None
-
-    for voltage in range(500, 149, -25):
-        print(f"\nTesting Voltage={voltage}...")
-        stats = test_parameters_multiple(ser, voltage, pause, width, iterations=10)
-
-        print(f"  Crash rate: {stats['crash_rate']:.1f}%")
-        print(f"  Success rate: {stats['success_rate']:.1f}%")
-
-        if stats['success_rate'] > 0:
-            print(f"\n✓✓✓ SUCCESS FOUND at V={voltage}! ✓✓✓")
-            return voltage, stats
-
-        if stats['crash_rate'] == 100:
-            last_crash_voltage = voltage
-        elif stats['crash_rate'] == 0:
-            no_crash_voltage = voltage
-            print(f"\n✓ Found 0% crash voltage: {voltage}")
-            break
-        else:
-            # Found intermediate crash rate!
-            print(f"\n✓ Found intermediate crash rate: {stats['crash_rate']:.1f}% at V={voltage}")
-            return voltage, stats
+    print(f"Testing at Pause={pause}, Width={width}, Voltage={lo}-{hi}V\n")
 
-    # Phase 2b: Fine-tune voltage to get ~50% crash rate
-    if last_crash_voltage is not None and no_crash_voltage is not None:
-        print(f"\n\nPhase 2b: Fine-tuning voltage between {no_crash_voltage}V and {last_crash_voltage}V...")
+    inv_phi = (math.sqrt(5) - 1) / 2
+    measured = {}
 
-        # Test intermediate voltages
-        for voltage in range(no_crash_voltage + 5, last_crash_voltage + 1, 5):
-            print(f"\nTesting Voltage={voltage}...")
+    def measure(voltage):
+        if voltage not in measured:
+            print(f"\nTesting Voltage={voltage} (bracket {lo}-{hi}V)...")
             stats = test_parameters_multiple(ser, voltage, pause, width, iterations=10)
-
             print(f"  Crash rate: {stats['crash_rate']:.1f}%")
             print(f"  Success rate: {stats['success_rate']:.1f}%")
+            measured[voltage] = stats
+        return measured[voltage]
 
-            if stats['success_rate'] > 0:
-                print(f"\n✓✓✓ SUCCESS FOUND at V={voltage}! ✓✓✓")
-                return voltage, stats
-
-            if 0 < stats['crash_rate'] < 100:
-                print(f"\n✓ Optimal voltage found: {voltage} (crash rate: {stats['crash_rate']:.1f}%)")
-                return voltage, stats
-
-        # If we still haven't found intermediate, use the lowest voltage that had some crashes
-        print(f"\n✓ Using voltage: {no_crash_voltage + 5}V (boundary voltage)")
-        return no_crash_voltage + 5, None
-
-    print("\n✗ Could not find optimal voltage!")
-    return 150, None
-
-
-def explore_pause_range_at_voltage(ser, voltage, width=150):
-    """Explore full pause range at locked voltage with progressively finer steps."""
+    def done(voltage):
+        stats = measured[voltage]
+        if stats['success_rate'] > 0:
+            print(f"\n✓✓✓ SUCCESS FOUND at V={voltage}! ✓✓✓")
+            return True
+        return stats['crash_rate'] == target
+
+    c = round(hi - inv_phi * (hi - lo))
+    d = round(lo + inv_phi * (hi - lo))
+    for voltage in (c, d):
+        measure(voltage)
+        if done(voltage):
+            return voltage, measured[voltage]
+
+    while hi - lo > tol:
+        rate_c = measured[c]['crash_rate']
+        rate_d = measured[d]['crash_rate']
+        err_c = abs(rate_c - target)
+        err_d = abs(rate_d - target)
+
+        if err_c < err_d or (err_c == err_d and rate_c >= target):
+            # Best is at or below d: drop (d, hi], old c becomes new d
+            hi, d = d, c
+            c = voltage = round(hi - inv_phi * (hi - lo))
+        else:
+            # Best is at or above c: drop [lo, c), old d becomes new c
+            lo, c = c, d
+            d = voltage = round(lo + inv_phi * (hi - lo))
+
+        measure(voltage)
+        if done(voltage):
+            return voltage, measured[voltage]
+
+    voltage = min(measured, key=lambda v: abs(measured[v]['crash_rate'] - target))
+    stats = measured[voltage]
+    if stats['success_rate'] <= 0:
+        print(f"\n✓ Optimal voltage found: {voltage} (crash rate: {stats['crash_rate']:.1f}%)")
+    return voltage, stats
+
+
+def van_der_corput_order(values):
+    """Reorder values along the base-2 van der Corput (1-D Sobol) sequence.
+
+    Early picks are spread over the whole range and later ones fill the gaps,
+    so a pass reaches every region of the pause range sooner than in order.
+    """
+    bits = max(1, (len(values) - 1).bit_length())
+    order = []
+    for k in range(1 << bits):
+        idx = int(format(k, f'0{bits}b')[::-1], 2)
+        if idx < len(values):
+            order.append(values[idx])
+    return order
+
+
+def explore_pause_range_at_voltage(rigs, voltage, width=150, sampler='grid'):
+    """Explore full pause range at locked voltage with progressively finer steps.
+
+    rigs is a list of open, set-up serial ports (one per Pico/ChipSHOUTER
+    rig). Each probe is independent, so every rig pulls pause values from a
+    shared queue and all rigs stop once any of them sees a success.
+    sampler 'grid' visits each pass in order; 'sobol' in quasi-random order.
+    """
     print("\n" + "=" * 70)
     print("PHASE 3: Exploring pause range at optimal voltage")
     print("=" * 70)
-    print(f"Testing at V={voltage}, Width={width}\n")
+    print(f"Testing at V={voltage}, Width={width} on {len(rigs)} rig(s)\n")
 
-    # Create result log
+    # Create result database (WAL, so it can be analyzed while running)
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    csv_file = f"adaptive_results_{timestamp}_V{voltage}.csv"
+    db_file = f"adaptive_results_{timestamp}_V{voltage}.db"
 
-    with open(csv_file, 'w', newline='', buffering=1) as f:
-        writer = csv.writer(f)
-        writer.writerow(['pause', 'voltage', 'width', 'success_rate', 'crash_rate', 'results'])
+    conn = sqlite3.connect(db_file, isolation_level=None, check_same_thread=False)
+    try:
+        conn.executescript(RUNS_SCHEMA)
+        conn.execute("BEGIN")
+        db_lock = threading.Lock()
+        db_state = {'rows': 0, 'last_commit': time.time()}
 
-        # Progressive step sizes: start coarse, get finer if no success
+        # Progressive step sizes: start coarse, get finer if no success.
+        # Each pass is a stride over one precomputed range.
         step_sizes = [100, 10, 5]
+        all_pauses = range(0, 8001, PAUSE_RESOLUTION)
 
         for step_idx, step in enumerate(step_sizes):
             print(f"\n{'='*70}")
             print(f"Pass {step_idx + 1}: Testing with step size = {step} cycles")
             print(f"{'='*70}\n")
 
-            pause_values = list(range(0, 8001, step))
-            success_found = False
-
+            pause_values = all_pauses[::step // PAUSE_RESOLUTION]
+            if sampler == 'sobol':
+                pause_values = van_der_corput_order(pause_values)
+            pending = queue.Queue()
             for i, pause in enumerate(pause_values):
-                print(f"\n[{i+1}/{len(pause_values)}] Testing Pause={pause} (step={step})...")
-                stats = test_parameters_multiple(ser, voltage, pause, width, iterations=10)
-
-                print(f"  Success: {stats['success_rate']:.1f}%  Crash: {stats['crash_rate']:.1f}%")
-
-                writer.writerow([pause, voltage, width, stats['success_rate'],
-                               stats['crash_rate'], ','.join(stats['results'])])
-                f.flush()
-
-                if stats['success_rate'] > 0:
-                    print(f"\n✓✓✓ SUCCESS at Pause={pause}! ✓✓✓")
-                    success_found = True
-                    break
-
-            if success_found:
+                pending.put((i, pause))
+            success_found = threading.Event()
+
+            def worker(ser):
+                while not success_found.is_set():
+                    try:
+                        i, pause = pending.get_nowait()
+                    except queue.Empty:
+                        return
+
+                    print(f"\n[{i+1}/{len(pause_values)}] {ser.port}: Testing Pause={pause} (step={step})...")
+                    stats = test_parameters_multiple(ser, voltage, pause, width, iterations=10)
+
+                    print(f"  {ser.port} Pause={pause}: Success: {stats['success_rate']:.1f}%  Crash: {stats['crash_rate']:.1f}%")
+
+                    # Only log attempts made here; cached ones came from phases 1-2
+                    first = len(stats['results']) - stats['fresh']
+                    ts = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    with db_lock:
+                        conn.executemany(
+                            "INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?)",
+                            [(ts, voltage, pause, width, result, round(t, 2))
+                             for result, t in zip(stats['results'][first:], stats['elapsed'][first:])])
+                        db_state['rows'] += stats['fresh']
+                        if (db_state['rows'] >= DB_COMMIT_ROWS
+                                or time.time() - db_state['last_commit'] >= DB_COMMIT_SECS):
+                            conn.execute("COMMIT")
+                            conn.execute("BEGIN")
+                            db_state['rows'] = 0
+                            db_state['last_commit'] = time.time()
+
+                    if stats['success_rate'] > 0:
+                        print(f"\n✓✓✓ SUCCESS at Pause={pause} ({ser.port})! ✓✓✓")
+                        success_found.set()
+
+            with ThreadPoolExecutor(max_workers=len(rigs)) as pool:
+                # list() re-raises any worker exception here
+                list(pool.map(worker, rigs))
+
+            if success_found.is_set():
                 break
 
             # If we finished this pass without success, move to finer step
@@ -264,18 +407,52 @@ def explore_pause_range_at_voltage(ser, voltage, width=150):
                 print(f"No success found with step={step}. Moving to finer granularity...")
                 print(f"{'='*70}")
 
-    print(f"\nResults saved to: {csv_file}")
-    return csv_file
+    finally:
+        # Keep whatever was recorded, including on Ctrl-C
+        if conn.in_transaction:
+            conn.execute("COMMIT")
+        conn.close()
+
+    print(f"\nResults saved to: {db_file}")
+    return db_file
 
 
 def main():
+    parser = argparse.ArgumentParser(
+        description='Adaptive glitch parameter exploration'
+    )
+    parser.add_argument(
+        '--rigs',
+        default=SERIAL_PORT,
+        help=f'Comma-separated serial ports, one per Pico/ChipSHOUTER rig; '
+             f'phases 1-2 use the first, phase 3 shares pauses over all '
+             f'(default: {SERIAL_PORT})'
+    )
+    parser.add_argument(
+        '--sampler',
+        choices=['grid', 'sobol'],
+        default='grid',
+        help='Phase 3 pause order per pass: grid (ascending) or sobol '
+             '(quasi-random, spread across the range first) (default: grid)'
+    )
+    parser.add_argument(
+        '-q', '--quiet',
+        action='store_true',
+        help='Suppress per-attempt result lines'
+    )
+    args = parser.parse_args()
+    global QUIET
+    QUIET = args.quiet
+    ports = [p.strip() for p in args.rigs.split(',') if p.strip()]
+
     print("=" * 70)
     print("ADAPTIVE GLITCH PARAMETER EXPLORATION")
     print("=" * 70)
     print()
 
     # Connect
-    ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=TIMEOUT)
+    ser = serial.Serial(ports[0], BAUD_RATE, timeout=TIMEOUT)
+    rigs = [ser]
     time.sleep(0.5)
 
     try:
@@ -295,17 +472,26 @@ def main():
             print("=" * 70)
             return
 
+        # Bring up any additional rigs for the parallel pause exploration
+        for port in ports[1:]:
+            rig = serial.Serial(port, BAUD_RATE, timeout=TIMEOUT)
+            rigs.append(rig)
+            time.sleep(0.5)
+            print(f"Rig {port}:")
+            setup_system(rig)
+
         # Phase 3: Explore pause range at optimal voltage
         # This will now automatically try progressively finer steps: 100 -> 10 -> 5
-        csv_file = explore_pause_range_at_voltage(ser, optimal_voltage)
+        db_file = explore_pause_range_at_voltage(rigs, optimal_voltage, sampler=args.sampler)
 
         print("\n" + "=" * 70)
         print("EXPLORATION COMPLETE")
         print("=" * 70)
-        print(f"Results: {csv_file}")
+        print(f"Results: {db_file}")
 
     finally:
-        ser.close()
+        for rig in rigs:
+            rig.close()
 
 
 if __name__ == "__main__":
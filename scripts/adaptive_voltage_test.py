@@ -9,6 +9,8 @@ import serial
 import time
 import csv
 from datetime import datetime
+import os
+import re
 import sys
 
 SERIAL_PORT = '/dev/ttyACM0'
@@ -20,9 +22,22 @@ TARGET_CRASH_RATE_MIN = 10  # Minimum 10% crashes
 TARGET_CRASH_RATE_MAX = 60  # Maximum 60% crashes
 SAMPLE_SIZE = 50  # Check every 50 tests
 
+# CSV log is flushed to disk every N rows or N seconds, whichever comes first
+CSV_FLUSH_ROWS = 50
+CSV_FLUSH_SECS = 10.0
+
+# Target response classifiers, matched against the raw TARGET SEND bytes
+_ERROR19_RE = re.compile(rb'31 39 0D 0A|\| 19\.\.')
+_SUCCESS_RE = re.compile(rb'30 0D 0A|\A(?=.*?30 ).*?\| 0', re.S)
+# Hex dump lines worth logging for GARBAGE: >10 chars, an upper-case hex
+# digit, and not the prompt / OK: / TARGET echo
+_HEX_LINE_RE = re.compile(rb'^(?!>|OK:|TARGET)(?=[^\n]*[0-9A-F])[^\n]{11,}', re.M)
+
+# Last values sent to the ChipSHOUTER/Pico, so unchanged ones aren't re-sent
+_last_sent = {'voltage': None, 'pause': None, 'width': None}
+
 def send_command(ser, cmd, wait_time=0.2):
-    if ser.in_waiting > 0:
-        ser.read(ser.in_waiting)
+    ser.reset_input_buffer()
     ser.write(f"{cmd}\r\n".encode())
 
     if cmd.startswith("CS "):
@@ -46,16 +61,26 @@ def send_command(ser, cmd, wait_time=0.2):
 
 
 def wait_for_response(ser, expected_text, timeout=5.0):
-    start_time = time.time()
-    full_response = ""
-    while time.time() - start_time < timeout:
-        if ser.in_waiting > 0:
-            chunk = ser.read(ser.in_waiting).decode('utf-8', errors='ignore')
-            full_response += chunk
-            if expected_text in full_response:
-                return True, full_response
-        time.sleep(0.01)
-    return False, full_response
+    """Block in read() (no sleep polling) until expected_text arrives or timeout."""
+    deadline = time.monotonic() + timeout
+    expected = expected_text.encode()
+    buf = bytearray()
+    saved_timeout = ser.timeout
+    try:
+        remaining = timeout
+        while remaining > 0:
+            ser.timeout = remaining
+            first = ser.read(1)
+            if not first:
+                break
+            buf += first
+            buf += ser.read(ser.in_waiting)
+            if expected in buf:
+                return True, buf.decode('utf-8', errors='ignore')
+            remaining = deadline - time.monotonic()
+    finally:
+        ser.timeout = saved_timeout
+    return False, buf.decode('utf-8', errors='ignore')
 
 
 def check_and_clear_chipshouter_faults(ser, voltage=None):
@@ -85,6 +110,7 @@ def check_and_clear_chipshouter_faults(ser, voltage=None):
         # Clear didn't work - reset as last resort
         print("  ⚠ Clear faults didn't work, resetting ChipSHOUTER...", flush=True)
         send_command(ser, "CS RESET", wait_time=0.5)
+        _last_sent['voltage'] = None
         time.sleep(5.0)
 
         # Re-configure voltage and re-arm after reset
@@ -114,18 +140,31 @@ def setup_system(ser):
 
 def test_single_glitch(ser, voltage, pause, width):
     """Test single glitch parameters."""
-    # Update ChipSHOUTER voltage
-    send_command(ser, f"CS VOLTAGE {voltage}", wait_time=0.5)
-
-    # Update Pico pause
-    send_command(ser, f"SET PAUSE {pause}", wait_time=0.2)
+    # Queue changed parameters (ChipSHOUTER voltage, Pico pause/width) and
+    # the bootloader sync as one burst. The Pico runs CLI commands in FIFO
+    # order, so the updates complete while we wait on the sync.
+    wanted = {'voltage': voltage, 'pause': pause, 'width': width}
+    commands = {'voltage': "CS VOLTAGE {}", 'pause': "SET PAUSE {}", 'width': "SET WIDTH {}"}
+    updates = {key: commands[key].format(value) for key, value in wanted.items()
+               if _last_sent[key] != value}
+
+    ser.reset_input_buffer()
+    burst = "".join(f"{cmd}\r\n" for cmd in updates.values())
+    ser.write(f"{burst}TARGET SYNC 115200 12000 10\r\n".encode())
+    success, response = wait_for_response(ser, "LPC ISP sync complete",
+                                          timeout=5.0 + 0.5 * len(updates))
+
+    # Only cache values whose command was acknowledged; resend the rest.
+    # Each command's reply runs from its echo to the next echo, so a TARGET
+    # SYNC retry's "ERROR: Timeout..." doesn't count against the parameters.
+    echoes = [*updates.values(), "TARGET SYNC"]
+    start = response.find(echoes[0])
+    for i, key in enumerate(updates):
+        end = response.find(echoes[i + 1], start + 1) if start >= 0 else -1
+        acked = success and end >= 0 and "ERROR" not in response[start:end]
+        _last_sent[key] = wanted[key] if acked else None
+        start = end
 
-    # Update Pico width
-    send_command(ser, f"SET WIDTH {width}", wait_time=0.2)
-
-    # Sync with bootloader
-    ser.write(b"TARGET SYNC 115200 12000 10\r\n")
-    success, _ = wait_for_response(ser, "LPC ISP sync complete", timeout=5.0)
     if not success:
         return "SYNC_FAIL", ""
 
@@ -136,39 +175,35 @@ def test_single_glitch(ser, voltage, pause, width):
     ser.write(b'TARGET SEND "R 0 516096"\r\n')
 
     # Wait for response with longer timeout to capture target data
-    response = ""
+    response = bytearray()
     start_time = time.time()
     max_wait = 3.0
 
     while time.time() - start_time < max_wait:
         time.sleep(0.1)
         if ser.in_waiting > 0:
-            chunk = ser.read(ser.in_waiting).decode('utf-8', errors='ignore')
+            chunk = ser.read(ser.in_waiting)
             response += chunk
-            if "> " in chunk or "ARM ON" in chunk:
+            if b"> " in chunk or b"ARM ON" in chunk:
                 break
 
     # Parse result based on actual response content
-    if "Response (" in response:
+    if b"Response (" in response:
         # Target responded - check what it sent
-        if "31 39 0D 0A" in response or "| 19.." in response:
+        if _ERROR19_RE.search(response):
             return "ERROR19", ""
-        elif "30 0D 0A" in response or "30 " in response and "| 0" in response:
+        elif _SUCCESS_RE.search(response):
             return "SUCCESS", ""
         else:
             # Extract hex data
-            hex_data = ""
-            for line in response.split('\n'):
-                if line.strip() and not line.startswith('>') and not line.startswith('OK:') and not line.startswith('TARGET'):
-                    if any(c in line for c in '0123456789ABCDEF') and len(line) > 10:
-                        hex_data += line.strip() + " "
-            return "GARBAGE", hex_data.strip()
-    elif "No response data" in response:
+            hex_data = b" ".join(m.strip() for m in _HEX_LINE_RE.findall(response))
+            return "GARBAGE", hex_data.decode('utf-8', errors='ignore')
+    elif b"No response data" in response:
         return "NO_RESPONSE", ""
     elif not response.strip():
         return "NO_RESPONSE", ""
     else:
-        return "UNKNOWN", response[:100]
+        return "UNKNOWN", response.decode('utf-8', errors='ignore')[:100]
 
 
 def main():
@@ -203,6 +238,7 @@ def main():
 
         # Counters
         current_voltage = starting_voltage
+        v_lo, v_hi = 150, 500  # Voltage bracket for the crash-rate target
         success_count = 0
         no_response_count = 0
         error19_count = 0
@@ -218,8 +254,9 @@ def main():
         start_time = time.time()
         last_print_time = start_time
         last_fault_check = start_time
+        last_flush = start_time
 
-        with open(csv_file, 'w', newline='', buffering=1) as f:
+        with open(csv_file, 'w', newline='') as f:
             writer = csv.writer(f)
             writer.writerow(['iteration', 'timestamp', 'voltage', 'pause', 'width', 'result', 'elapsed_time', 'response_data'])
 
@@ -231,7 +268,10 @@ def main():
                 # Log to CSV
                 ts = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
                 writer.writerow([i+1, ts, current_voltage, pause, width, result, f"{test_elapsed:.2f}", extra_data])
-                f.flush()
+                if (i + 1) % CSV_FLUSH_ROWS == 0 or time.time() - last_flush >= CSV_FLUSH_SECS:
+                    f.flush()
+                    os.fsync(f.fileno())
+                    last_flush = time.time()
 
                 # Update counters
                 if result == "SUCCESS":
@@ -262,10 +302,18 @@ def main():
                         print(f"\n[VOLTAGE CHECK] V={current_voltage}", flush=True)
                         print(f"  Last {SAMPLE_SIZE} tests: Success={window_success_rate:.1f}% Crash={window_crash_rate:.1f}%", flush=True)
 
+                        # Bisect towards the target crash band while the
+                        # bracket is wide, then fine-tune in 1V steps
+                        bisecting = v_hi - v_lo >= 3
+
                         # Adjust voltage if crash rate is too high
                         if window_crash_rate > TARGET_CRASH_RATE_MAX:
                             old_voltage = current_voltage
-                            current_voltage -= 1
+                            if bisecting:
+                                v_hi = current_voltage
+                                current_voltage = (v_lo + current_voltage) // 2
+                            else:
+                                current_voltage -= 1
                             if current_voltage < 150:
                                 current_voltage = 150
                             print(f"  ⚠ Crash rate too high! Reducing voltage: {old_voltage}V → {current_voltage}V", flush=True)
@@ -273,7 +321,11 @@ def main():
                         # Increase voltage if crash rate is too low (more room for glitching)
                         elif window_crash_rate < TARGET_CRASH_RATE_MIN and window_success_rate == 0:
                             old_voltage = current_voltage
-                            current_voltage += 1
+                            if bisecting:
+                                v_lo = current_voltage
+                                current_voltage = (current_voltage + v_hi) // 2
+                            else:
+                                current_voltage += 1
                             if current_voltage > 500:
                                 current_voltage = 500
                             print(f"  ↑ Crash rate too low, trying higher voltage: {old_voltage}V → {current_voltage}V", flush=True)
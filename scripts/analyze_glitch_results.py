@@ -1,43 +1,51 @@
 #!/usr/bin/env python3
 """
-Analyze glitch test results from CSV log.
+Analyze glitch test results from a CSV log or SQLite results database.
 
 Shows success rate, identifies successful parameter ranges,
 and generates visualizations of results.
 """
 
-import csv
+import io
+import multiprocessing
+import os
+import sqlite3
 import sys
-from collections import defaultdict
+from contextlib import closing, redirect_stdout
+
+import pandas as pd
+
+
+RESULT_COLUMNS = ['timestamp', 'voltage', 'pause', 'width', 'result', 'elapsed_time']
 
 
 def load_results(filename='glitch_results.csv'):
-    """Load results from CSV file."""
-    results = []
+    """Load results from CSV file or .db (runs table) into a DataFrame."""
+    if filename.endswith('.db'):
+        if not os.path.exists(filename):
+            print(f"Error: {filename} not found")
+            sys.exit(1)
+        # Read-only, so a running explorer's WAL database isn't blocked
+        with closing(sqlite3.connect(f"file:{filename}?mode=ro", uri=True)) as conn:
+            return pd.read_sql_query(
+                f"SELECT {', '.join(RESULT_COLUMNS)} FROM runs ORDER BY rowid", conn)
 
     try:
-        with open(filename, 'r') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                results.append({
-                    'timestamp': row['timestamp'],
-                    'voltage': int(row['voltage']),
-                    'pause': int(row['pause']),
-                    'width': int(row['width']),
-                    'result': row['result'],
-                    'elapsed_time': float(row['elapsed_time'])
-                })
+        return pd.read_csv(
+            filename,
+            usecols=RESULT_COLUMNS,
+            dtype={'voltage': 'int32', 'pause': 'int32', 'width': 'int32',
+                   'result': 'str', 'elapsed_time': 'float64'},
+        )
     except FileNotFoundError:
         print(f"Error: {filename} not found")
         sys.exit(1)
 
-    return results
-
 
 def analyze_results(results):
     """Analyze test results."""
 
-    if not results:
+    if results.empty:
         print("No results to analyze")
         return
 
@@ -47,88 +55,87 @@ def analyze_results(results):
     print()
 
     # Count by result type
-    result_counts = defaultdict(int)
-    for r in results:
-        result_counts[r['result']] += 1
+    result_counts = results['result'].value_counts()
 
     total = len(results)
     print(f"Total tests: {total}")
     print()
     print("Results:")
-    for result_type in sorted(result_counts.keys()):
-        count = result_counts[result_type]
+    for result_type in sorted(result_counts.index):
+        count = int(result_counts[result_type])
         pct = (count / total) * 100
         print(f"  {result_type:20s}: {count:6d} ({pct:6.3f}%)")
     print()
 
     # Success analysis
-    successes = [r for r in results if r['result'] == 'SUCCESS']
-    if successes:
+    successes = results[results['result'] == 'SUCCESS']
+    if not successes.empty:
         print("=" * 70)
         print(f"SUCCESS PARAMETERS ({len(successes)} found)")
         print("=" * 70)
         print()
 
-        for i, s in enumerate(successes, 1):
-            print(f"{i}. V={s['voltage']}, Pause={s['pause']}, Width={s['width']}")
-            print(f"   Time: {s['timestamp']}")
+        for i, s in enumerate(successes.itertuples(index=False), 1):
+            print(f"{i}. V={s.voltage}, Pause={s.pause}, Width={s.width}")
+            print(f"   Time: {s.timestamp}")
         print()
 
         # Parameter ranges that succeeded
-        voltages = set(s['voltage'] for s in successes)
-        pauses = set(s['pause'] for s in successes)
-        widths = set(s['width'] for s in successes)
-
         print("Successful parameter ranges:")
-        print(f"  Voltage: {sorted(voltages)}")
-        print(f"  Pause:   {sorted(pauses)}")
-        print(f"  Width:   {sorted(widths)}")
+        print(f"  Voltage: {sorted(successes['voltage'].unique().tolist())}")
+        print(f"  Pause:   {sorted(successes['pause'].unique().tolist())}")
+        print(f"  Width:   {sorted(successes['width'].unique().tolist())}")
         print()
 
     # No response analysis (crashes)
-    no_response = [r for r in results if r['result'] == 'NO_RESPONSE']
-    if no_response:
+    no_response = results[results['result'] == 'NO_RESPONSE']
+    if not no_response.empty:
         print("=" * 70)
         print(f"NO RESPONSE (CRASH) PARAMETERS ({len(no_response)} found)")
         print("=" * 70)
         print()
 
         # Show first 20
-        for i, s in enumerate(no_response[:20], 1):
-            print(f"{i}. V={s['voltage']}, Pause={s['pause']}, Width={s['width']}")
+        for i, s in enumerate(no_response.head(20).itertuples(index=False), 1):
+            print(f"{i}. V={s.voltage}, Pause={s.pause}, Width={s.width}")
             if i == 20 and len(no_response) > 20:
                 print(f"   ... and {len(no_response) - 20} more")
                 break
         print()
 
         # Parameter ranges that crashed
-        voltages = set(s['voltage'] for s in no_response)
-        pauses = set(s['pause'] for s in no_response)
-        widths = set(s['width'] for s in no_response)
-
         print("Crash parameter ranges:")
-        print(f"  Voltage: {sorted(voltages)}")
-        print(f"  Pause:   {min(pauses)}-{max(pauses)} cycles")
-        print(f"  Width:   {sorted(widths)}")
+        print(f"  Voltage: {sorted(no_response['voltage'].unique().tolist())}")
+        print(f"  Pause:   {no_response['pause'].min()}-{no_response['pause'].max()} cycles")
+        print(f"  Width:   {sorted(no_response['width'].unique().tolist())}")
         print()
 
     # Timing statistics
-    avg_time = sum(r['elapsed_time'] for r in results) / len(results)
-    min_time = min(r['elapsed_time'] for r in results)
-    max_time = max(r['elapsed_time'] for r in results)
+    timing = results['elapsed_time'].agg(['mean', 'min', 'max'])
 
     print("Timing statistics:")
-    print(f"  Average test time: {avg_time:.3f}s")
-    print(f"  Min test time:     {min_time:.3f}s")
-    print(f"  Max test time:     {max_time:.3f}s")
+    print(f"  Average test time: {timing['mean']:.3f}s")
+    print(f"  Min test time:     {timing['min']:.3f}s")
+    print(f"  Max test time:     {timing['max']:.3f}s")
     print()
 
     # Test rate
-    first_time = results[0]['timestamp']
-    last_time = results[-1]['timestamp']
+    first_time = results['timestamp'].iloc[0]
+    last_time = results['timestamp'].iloc[-1]
     print(f"Test period: {first_time} to {last_time}")
 
 
+def load_and_analyze(filename):
+    """Load and analyze one file; return (report text, ok) for printing by the parent."""
+    out = io.StringIO()
+    with redirect_stdout(out):
+        try:
+            analyze_results(load_results(filename))
+        except SystemExit:
+            return out.getvalue(), False
+    return out.getvalue(), True
+
+
 def main():
     import argparse
 
@@ -136,16 +143,31 @@ def main():
         description='Analyze glitch test results from CSV'
     )
     parser.add_argument(
-        'filename',
-        nargs='?',
-        default='glitch_results.csv',
-        help='CSV file to analyze (default: glitch_results.csv)'
+        'filenames',
+        nargs='*',
+        default=['glitch_results.csv'],
+        help='CSV files or .db results databases to analyze; several are '
+             'analyzed in parallel (default: glitch_results.csv)'
     )
 
     args = parser.parse_args()
 
-    results = load_results(args.filename)
-    analyze_results(results)
+    if len(args.filenames) == 1:
+        results = load_results(args.filenames[0])
+        analyze_results(results)
+        return
+
+    # One process per file; reports are printed in command-line order
+    all_ok = True
+    with multiprocessing.Pool(min(len(args.filenames), os.cpu_count() or 1)) as pool:
+        for filename, (report, ok) in zip(args.filenames,
+                                          pool.imap(load_and_analyze, args.filenames)):
+            print(f"\n### {filename}\n")
+            print(report, end='')
+            all_ok = all_ok and ok
+
+    if not all_ok:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
